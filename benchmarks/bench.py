@@ -0,0 +1,271 @@
+"""
+Throughput benchmarks for the scan, route, move and topic modeling stages.
+
+Synthetic trees are generated in tmpfs (`/dev/shm` when available) so the numbers
+measure the code rather than the disk. Every stage reports files (or documents)
+per second, and the results are written as JSON together with the commit they
+were measured on, so that two runs can be compared:
+
+    python -m benchmarks.bench --output before.json
+    git checkout other-branch
+    python -m benchmarks.bench --output after.json --compare before.json
+"""
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from src.Classifier import Classifier
+from src.FileUtils import FileUtils
+from src.model.TopicModeler import TopicModeler
+from src.MoveExecutor import MoveExecutor
+from src.Scanner import walk
+
+TMPFS = "/dev/shm"
+SEED = 1234
+# Words of the synthetic topics, the corpus mixes them so LDA has something to find
+TOPICWORDS = [
+    ["invoice", "payment", "amount", "bank", "account", "tax", "balance", "due"],
+    ["football", "match", "goal", "team", "player", "season", "coach", "league"],
+    ["recipe", "flour", "sugar", "oven", "butter", "bake", "dough", "salt"],
+    ["server", "kernel", "process", "memory", "thread", "socket", "cache", "disk"],
+    ["garden", "flower", "seed", "soil", "water", "plant", "leaf", "spring"],
+]
+
+
+def extensions(formats=None):
+    """Returns the distinct extensions of `formats`, sorted for reproducibility."""
+    formats = FileUtils.formats if formats is None else formats
+    return sorted({ext for exts in formats.values() for ext in exts})
+
+
+def make_flat_tree(directory, files, seed=SEED):
+    """Creates `files` empty files with mixed extensions in a single directory."""
+    rng = random.Random(seed)
+    exts = extensions() + ["zzz"]
+    os.makedirs(directory, exist_ok=True)
+    flags = os.O_CREAT | os.O_WRONLY
+    for idx in range(files):
+        os.close(os.open(os.path.join(directory, f"f{idx}.{rng.choice(exts)}"), flags))
+    return files
+
+
+def make_deep_tree(directory, depth=6, fanout=4, files_per_dir=16, seed=SEED):
+    """
+    Creates a tree `depth` levels deep with `fanout` sub-directories per directory
+    and `files_per_dir` small files in each of them.
+
+    Returns:
+        int: The number of files created.
+    """
+    rng = random.Random(seed)
+    exts = extensions()
+    count = 0
+    pending = [(directory, 0)]
+    while pending:
+        folder, level = pending.pop()
+        os.makedirs(folder, exist_ok=True)
+        for idx in range(files_per_dir):
+            path = os.path.join(folder, f"f{idx}.{rng.choice(exts)}")
+            with open(path, "wb") as f:
+                f.write(b"x" * rng.randrange(1, 4096))
+            count += 1
+        if level < depth:
+            for idx in range(fanout):
+                pending.append((os.path.join(folder, f"d{idx}"), level + 1))
+    return count
+
+
+def make_corpus(documents, words=200, seed=SEED):
+    """Returns `documents` texts, each drawn mostly from one of `TOPICWORDS`."""
+    rng = random.Random(seed)
+    everything = [word for topic in TOPICWORDS for word in topic]
+    corpus = []
+    for _ in range(documents):
+        topic = rng.choice(TOPICWORDS)
+        corpus.append(
+            " ".join(
+                rng.choice(topic) if rng.random() < 0.8 else rng.choice(everything)
+                for _ in range(words)
+            )
+        )
+    return corpus
+
+
+def measure(name, count, fn, results, console):
+    """Times `fn()` and records `count / seconds` under `name`."""
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    results[name] = {
+        "files": count,
+        "seconds": round(seconds, 4),
+        "files_per_second": round(count / seconds, 1) if seconds else None,
+    }
+    console.print(f"{name}: {count} in {seconds:.2f}s")
+
+
+def run(root, files=1_000_000, depth=6, fanout=4, documents=2000, topics=True):
+    """
+    Generates the synthetic trees in `root` and benchmarks every stage.
+
+    Returns:
+        dict: Stage name -> files, seconds and files_per_second.
+    """
+    console = Console(stderr=True)
+    quiet = Console(quiet=True)
+    results = {}
+    flat = os.path.join(root, "flat")
+    deep = os.path.join(root, "deep")
+    output = os.path.join(root, "output")
+
+    console.print(f"Generating {files} files in {flat}")
+    make_flat_tree(flat, files)
+    deep_files = make_deep_tree(deep, depth=depth, fanout=fanout)
+
+    classifier = Classifier(path=flat)
+    classifier.console = quiet
+    classifier.config = os.path.join(root, "classifier-master.conf")
+    formats = classifier.file_utility.formats
+    index = classifier.get_routing_index(formats)
+
+    def scan(directory, **kwargs):
+        for _ in walk(directory, extension=index.split_extension, **kwargs):
+            pass
+
+    measure("scan_flat", files, lambda: scan(flat, stat=False), results, console)
+    measure("scan_flat_stat", files, lambda: scan(flat), results, console)
+    measure("scan_deep", deep_files, lambda: scan(deep), results, console)
+
+    records = list(walk(flat, stat=False, extension=index.split_extension))
+
+    def route_extensions():
+        for record in records:
+            classifier._get_destination_folder(record.ext, formats, output)
+
+    def route_records():
+        for record in records:
+            classifier.route(record, index, output)
+
+    measure("route_extension", files, route_extensions, results, console)
+    measure("route", files, route_records, results, console)
+
+    moves = [(record, classifier.route(record, index, output)) for record in records]
+    moves = [(record, folder) for record, folder in moves if folder is not None]
+
+    def move():
+        with MoveExecutor(quiet, workers=1, verbose=False) as mover:
+            for record, dest_folder in moves:
+                mover.submit(record.name, record.directory, dest_folder)
+
+    measure("move", len(moves), move, results, console)
+    shutil.rmtree(output)
+
+    classifier.max_depth = None
+    measure(
+        "classify_deep",
+        deep_files,
+        lambda: classifier.classify(formats, output, deep),
+        results,
+        console,
+    )
+
+    if topics:
+        corpus = make_corpus(documents)
+        modeler = TopicModeler(num_topics=len(TOPICWORDS))
+
+        def topic_modeling():
+            modeler.fit(corpus, passes=1)
+            for _ in modeler.infer(corpus):
+                pass
+
+        measure("topic_modeling", documents, topic_modeling, results, console)
+    return results
+
+
+def environment():
+    """Describes the machine and the commit the benchmarks ran on."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, console):
+    """Prints the files/sec of `results` against those of `baseline`."""
+    table = Table(title=f"Compared to {baseline['environment'].get('commit')}")
+    for column in ("Stage", "Baseline files/s", "Files/s", "Ratio"):
+        table.add_column(column, justify="left" if column == "Stage" else "right")
+    for name, result in results.items():
+        before = baseline["results"].get(name, {}).get("files_per_second")
+        after = result["files_per_second"]
+        ratio = f"{after / before:.2f}x" if before and after else "-"
+        table.add_row(name, str(before or "-"), str(after or "-"), ratio)
+    console.print(table)
+
+
+app = typer.Typer()
+
+
+@app.command(help="Benchmark the scan, route, move and topic modeling throughput")
+def main(
+    files: int = typer.Option(1_000_000, help="Files of the flat directory"),
+    depth: int = typer.Option(6, help="Levels of the deep tree"),
+    fanout: int = typer.Option(
+        4, help="Sub-directories per directory of the deep tree"
+    ),
+    documents: int = typer.Option(2000, help="Documents of the topic modeling corpus"),
+    topics: bool = typer.Option(True, help="Benchmark topic modeling"),
+    root: Optional[str] = typer.Option(
+        None, help="Where to generate the trees, tmpfs by default"
+    ),
+    output: Optional[str] = typer.Option(None, help="Write the results to this JSON"),
+    baseline: Optional[str] = typer.Option(
+        None, "--compare", help="Results JSON of a previous run to compare with"
+    ),
+):
+    console = Console()
+    parent = root or (TMPFS if os.path.isdir(TMPFS) else None)
+    directory = tempfile.mkdtemp(prefix="classifier-bench-", dir=parent)
+    try:
+        results = run(directory, files, depth, fanout, documents, topics)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    report = {"environment": environment(), "results": results}
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if baseline:
+        with open(baseline) as f:
+            compare(results, json.load(f), console)
+
+
+if __name__ == "__main__":
+    app()
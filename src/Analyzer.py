@@ -0,0 +1,140 @@
+import csv
+import json
+import time
+from array import array
+
+import numpy as np
+import pandas as pd
+
+# Upper bounds of the age histogram buckets, in days
+AGEBUCKETS = [1, 7, 30, 90, 365, 3 * 365]
+PERCENTILES = [50, 90, 99]
+
+
+def scan_table(records, index=None):
+    """
+    Loads `FileRecord`s into a columnar DataFrame.
+
+    Sizes and times go straight into typed arrays and extensions are interned into
+    integer codes, so a row costs a few dozen bytes however many files are scanned.
+    The records must carry their stat fields.
+
+    Args:
+        records (iterable): The files, e.g. from `Scanner.walk`.
+        index (RoutingIndex): Adds a `category` column when given.
+
+    Returns:
+        pandas.DataFrame: The ext, size, mtime and ctime (and category) columns.
+    """
+    codes = {}
+    ext_codes = array("i")
+    sizes = array("q")
+    mtimes = array("d")
+    ctimes = array("d")
+    for record in records:
+        code = codes.get(record.ext)
+        if code is None:
+            code = codes[record.ext] = len(codes)
+        ext_codes.append(code)
+        sizes.append(record.size)
+        mtimes.append(record.mtime)
+        ctimes.append(record.ctime)
+
+    extensions = list(codes)
+    ext_codes = np.frombuffer(ext_codes, dtype=np.int32) if ext_codes else []
+    table = pd.DataFrame(
+        {
+            "ext": pd.Categorical.from_codes(ext_codes, categories=extensions),
+            "size": np.frombuffer(sizes, dtype=np.int64) if sizes else [],
+            "mtime": np.frombuffer(mtimes, dtype=np.float64) if mtimes else [],
+            "ctime": np.frombuffer(ctimes, dtype=np.float64) if ctimes else [],
+        }
+    )
+    if index is not None:
+        # one lookup per distinct extension, then a vectorized mapping
+        categories = [index.category(ext) or "unknown" for ext in extensions]
+        table["category"] = pd.Categorical(
+            np.asarray(categories, dtype=object)[ext_codes] if len(table) else []
+        )
+    return table
+
+
+def analyze(table, now=None):
+    """
+    Summarizes a `scan_table` with vectorized group-bys.
+
+    Returns:
+        dict: Totals, size percentiles, an age histogram (by modification time) and
+            file counts, bytes and shares per extension and per category.
+    """
+    now = time.time() if now is None else now
+    files = len(table)
+    total = int(table["size"].sum())
+    sizes = table["size"].to_numpy()
+    report = {
+        "files": files,
+        "bytes": total,
+        "size_percentiles": {
+            f"p{p}": float(np.percentile(sizes, p)) if files else 0.0
+            for p in PERCENTILES
+        },
+        "largest": int(sizes.max()) if files else 0,
+    }
+
+    age_days = (now - table["mtime"].to_numpy()) / 86400
+    bounds = [-np.inf] + AGEBUCKETS + [np.inf]
+    labels = [f"<{AGEBUCKETS[0]}d"]
+    labels += [f"{low}-{high}d" for low, high in zip(AGEBUCKETS, AGEBUCKETS[1:])]
+    labels.append(f">={AGEBUCKETS[-1]}d")
+    buckets = pd.cut(age_days, bounds, labels=labels, right=False)
+    report["age"] = _breakdown(
+        table.assign(age=buckets), "age", files, total, by_bytes=False
+    )
+
+    report["extensions"] = _breakdown(table, "ext", files, total)
+    if "category" in table:
+        report["categories"] = _breakdown(table, "category", files, total)
+    return report
+
+
+def _breakdown(table, column, files, total, by_bytes=True):
+    grouped = table.groupby(column, observed=False)["size"].agg(["count", "sum"])
+    if by_bytes:
+        grouped = grouped.sort_values("sum", ascending=False, kind="stable")
+    return {
+        str(key): {
+            "files": int(row["count"]),
+            "bytes": int(row["sum"]),
+            "percent": round(100 * row["count"] / files, 2) if files else 0.0,
+            "percent_bytes": round(100 * row["sum"] / total, 2) if total else 0.0,
+        }
+        for key, row in grouped.iterrows()
+    }
+
+
+def save_report(report, path):
+    """Writes `report` to `path`, as CSV when it ends with .csv, else as JSON."""
+    if not path.lower().endswith(".csv"):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["section", "key", "files", "bytes", "percent", "percent_bytes"]
+        )
+        writer.writerow(["total", "", report["files"], report["bytes"], 100, 100])
+        for key, value in report["size_percentiles"].items():
+            writer.writerow(["size_percentile", key, "", value, "", ""])
+        for section in ("age", "extensions", "categories"):
+            for key, row in report.get(section, {}).items():
+                writer.writerow(
+                    [
+                        section,
+                        key,
+                        row["files"],
+                        row["bytes"],
+                        row["percent"],
+                        row["percent_bytes"],
+                    ]
+                )
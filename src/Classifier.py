@@ -4,23 +4,75 @@ This script is a file classifier that organizes files in a directory based on th
 It uses the Typer library to create a command-line interface for users to interact with the script.
 
 """
+import bisect
+import hashlib
+import heapq
 import os
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import arrow
 from rich.console import Console
+from rich.table import Table
 
+from src.Deduplicator import Deduplicator
+from src.Deduplicator import HashCache
 from src.FileUtils import FileUtils
+from src.MagicDetector import MagicDetector
+from src.MoveExecutor import MoveExecutor
+from src.MoveJournal import MoveJournal
+from src.MoveJournal import undo_journal
+from src.MovePlan import MovePlan
 from src.model.TopicModeler import TopicModeler
+from src.RoutingIndex import parse_config
+from src.RoutingIndex import RoutingIndex
+from src.RuleEngine import SIZEUNITS
+from src.ScanIndex import ScanIndex
+from src.Scanner import FileRecord
+from src.Scanner import walk
+from src.Stats import NULLSTATS
+from src.Stats import Stats
+from src.TextExtractor import hash_file
+from src.TextExtractor import TextExtractor
+from src.Watcher import Watcher
 
 VERSION = "FileClassifier"
 DIRCONFFILE = ".classifier.conf"
+DIRINDEXFILE = ".classifier.db"
+TOPICMODELDIR = "topics"
+EMBEDDINGDIR = "embeddings"
+TOPICEXTENSIONS = ["txt", "pdf", "doc", "docx"]
+FALLBACKBATCHSIZE = 1024
+DUPLICATESFOLDER = "duplicates"
+SIZEBUCKETS = [1 << 20, 100 << 20, 1 << 30]
+SKIPPEDFILES = {DIRCONFFILE, DIRINDEXFILE, f"{DIRINDEXFILE}-journal"}
 PLATFORM = sys.platform
 OS = os.name
 
 
+def user_cache_dir(kind, directory):
+    """
+    Returns the folder of the user's cache holding the `kind` models of `directory`.
+
+    Models are pickled, so they are never kept in the classified folder, where
+    anyone allowed to drop a file could have them load arbitrary code.
+    """
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    digest = hashlib.sha1(os.path.abspath(directory).encode("utf-8")).hexdigest()
+    return os.path.join(cache_home, "FileClassifier", kind, digest[:16])
+
+
+def _hash_or_none(path):
+    try:
+        return hash_file(path)
+    except OSError:
+        return None
+
+
 class Classifier:
     """
     All format lists were taken from wikipedia, not all of them were added due to extensions
@@ -32,13 +84,70 @@ class Classifier:
     Minetypes 	-	https://www.freeformatter.com/mime-types-list.html
     """
 
-    def __init__(self, path: str, config: Optional[str] = None):
+    def __init__(
+        self,
+        path: str,
+        config: Optional[str] = None,
+        workers: int = 1,
+        max_depth: Optional[int] = 0,
+        incremental: bool = False,
+        full_rescan: bool = False,
+        content_detection: str = "unknown",
+        model_path: Optional[str] = None,
+        dry_run: bool = False,
+        journal_path: Optional[str] = None,
+        resume: bool = False,
+        duplicates: Optional[str] = None,
+        stats: bool = False,
+    ):
         self.config = config
+        self.workers = workers
+        self.max_depth = max_depth
+        self.incremental = incremental
+        self.full_rescan = full_rescan
+        self.content_detection = content_detection
+        self.model_path = model_path
+        self.plan = MovePlan() if dry_run else None
+        self.journal_path = journal_path
+        self.resume = resume
+        self.duplicates = duplicates
+        self.detector = MagicDetector()
         self.get_config()
         self.path = path
         self.console = Console()
-        self.file_utils = FileUtils(self.path, self.config, self.console)
-        self.topic_modeler = TopicModeler()
+        self.stats = Stats() if stats else NULLSTATS
+        if stats:
+            self.console.print = self.stats.timed("print", self.console.print)
+        self.file_utility = FileUtils(self.path, self.config, self.console)
+        self._topic_modeler = None
+        self._fallback_model = None
+        self._journal = None
+        self._routing_index = None
+        self._routing_key = None
+
+    @property
+    def topic_modeler(self):
+        """The topic modeler, created on first use so other modes never load nltk."""
+        if self._topic_modeler is None:
+            self._topic_modeler = TopicModeler()
+        return self._topic_modeler
+
+    @property
+    def fallback_model(self):
+        """The model saved at `model_path` routing unknown files, or None."""
+        if self._fallback_model is None and self.model_path is not None:
+            # sklearn is only imported by the runs that need it
+            from src.model.SVMFileClassifier import SGDFileClassifier
+
+            self._fallback_model = SGDFileClassifier.load(self.model_path)
+        return self._fallback_model
+
+    @property
+    def journal(self):
+        """The journal of completed moves, opened on first use if `journal_path` is set."""
+        if self._journal is None and self.journal_path is not None:
+            self._journal = MoveJournal(self.journal_path, resume=self.resume)
+        return self._journal
 
     def get_config(self):
         """Determines the appropriate configuration file location based on the platform."""
@@ -60,7 +169,7 @@ class Classifier:
 
         with open(self.config, "w") as conffile:
             conffile.write("IGNORE: part, desktop\n")
-            for category, extensions in self.formats.items():
+            for category, extensions in self.file_utility.formats.items():
                 conffile.write(f"{category.capitalize()}: {', '.join(extensions)}\n")
 
         self.console.print(f"CONFIG file created at: {self.config}")
@@ -73,152 +182,727 @@ class Classifier:
         if not os.path.isfile(self.config):
             self.create_default_config()
 
-        with open(self.config) as file:
-            for items in file:
-                if items.strip() and ":" in items:
-                    key, val = items.strip().split(":")
-                    key = key.strip()
-                    val = val.strip().split(", ")
-                    self.file_utility.formats[key] = val
+        for key, val in parse_config(self.config).items():
+            self.file_utility.formats[key] = val
         return
 
+    def get_routing_index(self, formats=None):
+        """
+        Returns the compiled extension -> category index.
+
+        The index is rebuilt only when the config file's mtime changes. A formats
+        dictionary other than `FileUtils.formats` is compiled as is.
+        """
+        formats = self.file_utility.formats if formats is None else formats
+        if formats is not self.file_utility.formats:
+            # explicit formats (e.g. --specific-types) are not merged with the config
+            return RoutingIndex.from_formats(formats)
+        try:
+            mtime = os.stat(self.config).st_mtime_ns
+        except (OSError, TypeError):
+            mtime = None
+        if self._routing_index is None or self._routing_key != mtime:
+            self._routing_index = RoutingIndex.from_config(formats, self.config)
+            self._routing_key = mtime
+        return self._routing_index
+
     def move_to(self, filename, from_folder, to_folder):
         self.file_utility.move_to(filename, from_folder, to_folder)
 
+    def get_mover(self):
+        """
+        Returns a move executor using the configured number of workers, or the move
+        plan being filled in dry-run mode.
+        """
+        if self.plan is not None:
+            return self.plan
+        return MoveExecutor(
+            self.console, workers=self.workers, journal=self.journal, stats=self.stats
+        )
+
+    def report_plan(self, path=None):
+        """Prints a summary of the dry-run plan, and saves it to `path` if given."""
+        plan = self.plan
+        for source, destination in plan.sorted_moves():
+            self.console.print(f"would move: {source} -> {destination}")
+        for source, destination in plan.collisions:
+            self.console.print(f"collision: {source} -> {destination}")
+        self.console.print(
+            f"{len(plan)} files to move, {len(plan.directories)} folders to create, "
+            f"{len(plan.collisions)} collisions"
+        )
+        if path:
+            plan.save(path)
+            self.console.print(f"Plan saved to {path}")
+
+    def execute_plan(self, path):
+        """Runs the moves of a plan saved by a dry run."""
+        plan = MovePlan.load(path)
+        planned = len(plan.collisions)
+        with MoveExecutor(
+            self.console, workers=self.workers, journal=self.journal, stats=self.stats
+        ) as mover:
+            plan.execute(mover)
+        # the collisions found by the mover itself were already reported
+        for source, destination in plan.collisions:
+            self.console.print(f"Skipping collision - {source} -> {destination}")
+        if len(plan.collisions) > planned:
+            self.console.print(
+                f"{len(plan.collisions) - planned} destinations appeared since the plan"
+            )
+
+    def undo(self, path):
+        """Moves the files listed in the journal at `path` back where they were."""
+        restored, errors = undo_journal(path)
+        for destination, error in errors:
+            self.console.print(f"Cannot restore file - {destination} - {str(error)}")
+        self.console.print(f"Restored {restored} files")
+
+    def scan(self, directory, output=None, **kwargs):
+        """
+        Streams the files to classify in `directory`, descending `self.max_depth` levels.
+
+        The folders listed in `FileUtils.folders` are pruned, and so is `output` when
+        it lives inside `directory`.
+        """
+        exclude = ()
+        if output is not None and os.path.abspath(output) != os.path.abspath(directory):
+            exclude = (output,)
+        records = walk(
+            directory,
+            max_depth=self.max_depth,
+            prune=self.file_utility.pruned_folders(),
+            exclude=exclude,
+            stats=self.stats,
+            **kwargs,
+        )
+        return self.stats.timed_iter("scan", records)
+
     def classify(self, formats, output, directory):
         """
         Classifies and moves the files in the specified directory based on their file type.
         """
-        for file in os.listdir(directory):
-            if file != DIRCONFFILE and os.path.isfile(os.path.join(directory, file)):
-                filename, file_ext = os.path.splitext(file)
-                file_ext = file_ext.lower().replace(".", "")
+        index = self.get_routing_index(formats)
+        scan_index = None
+        visited = []
+        visit = None
+        # a dry run must not mark anything as classified, and a file kept in place
+        # may be old enough for an age rule on the next run
+        if self.incremental and self.plan is None and not index.rules.ages:
+            scan_index = self.get_scan_index(index, output, directory)
+
+        # rewriting a file in place leaves its directory's mtime alone, so whole
+        # directories are only skipped when routing depends on file names alone
+        if (
+            scan_index is not None
+            and not index.rules.needs_stat
+            and self.content_detection == "off"
+            and self.model_path is None
+        ):
+
+            def visit(path, mtime):
+                visited.append((path, mtime))
+                return not scan_index.directory_unchanged(path, mtime)
+
+        records = self.scan(
+            directory,
+            output,
+            hidden=True,
+            stat=scan_index is not None
+            or self.duplicates is not None
+            or index.rules.needs_stat,
+            extension=index.split_extension,
+            visit=visit,
+        )
+        if scan_index is not None:
+            records = (record for record in records if not scan_index.unchanged(record))
+        originals = {}
+        if self.duplicates is not None:
+            # duplicates can only be told apart once every file has been seen
+            records = [record for record in records if record.name not in SKIPPEDFILES]
+            originals = self.find_duplicates(records)
+
+        unmatched = [] if self.fallback_model is not None else None
+        links = []
+        route = self.stats.timed("route", self.route)
+        with self.get_mover() as mover:
+            if self.duplicates == "link":
+                for original in originals.values():
+                    mover.track(original.path)
+            for record in records:
+                original = originals.get(record.path)
+                if original is not None and self.duplicates != "link":
+                    if self.duplicates == "move":
+                        folder = os.path.join(output, DUPLICATESFOLDER)
+                        mover.submit(record.name, record.directory, folder)
+                    continue
+                dest_folder = route(
+                    record, index, output, unmatched if original is None else None
+                )
+                if original is not None:
+                    links.append((record, original, dest_folder or record.directory))
+                    continue
+                if dest_folder is None:
+                    self.stats.count("skipped")
+                    if scan_index is not None:
+                        scan_index.remember(record, index.category(record.ext))
+                    continue
+                mover.submit(record.name, record.directory, dest_folder)
+            if unmatched:
+                self.route_unmatched(unmatched, output, mover)
+        for record, original, dest_folder in links:
+            target = mover.destination(original.path) or original.path
+            self.link_duplicate(record, target, dest_folder)
+
+        if scan_index is not None:
+            if not mover.errors and not mover.collisions:
+                # failed moves must be retried, so their folders are not marked as done
+                scan_index.remember_directories(visited)
+            scan_index.close()
+        return
+
+    def find_duplicates(self, records):
+        """Returns a {duplicate path: original FileRecord} dictionary for `records`."""
+        self.console.print("Looking for duplicates")
+        with HashCache() as cache, self.stats.timer("duplicates"):
+            return Deduplicator(cache, workers=max(4, self.workers)).duplicates(records)
+
+    def link_duplicate(self, record, target, dest_folder):
+        """
+        Replaces the duplicate `record` by a hard link to `target`, the path its
+        original was moved to (or left at), placed in `dest_folder`.
+
+        Nothing is touched unless `target` still has the content of `record`.
+        """
+        link = os.path.join(dest_folder, record.name)
+        if self.plan is not None:
+            self.console.print(f"would link: {link} -> {target}")
+            return
+        try:
+            same = os.path.samefile(target, record.path) or (
+                os.path.getsize(target) == os.path.getsize(record.path)
+                and hash_file(target) == hash_file(record.path)
+            )
+        except OSError as e:
+            self.console.print(f"Cannot link file - {record.path} - {str(e)}")
+            return
+        if not same:
+            self.console.print(f"Cannot link file - {record.path} - {target} changed")
+            return
+        tmp_link = os.path.join(dest_folder, f".{record.name}.{os.getpid()}.link")
+        try:
+            os.makedirs(dest_folder, exist_ok=True)
+            os.link(target, tmp_link)
+            os.replace(tmp_link, link)
+            if link != record.path:
+                os.unlink(record.path)
+        except OSError as e:
+            if os.path.lexists(tmp_link):
+                os.unlink(tmp_link)
+            self.console.print(f"Cannot link file - {record.path} - {str(e)}")
+            return
+        self.console.print(f"linked: {link}")
+
+    def route(self, record, index, output, unmatched=None):
+        """
+        Returns the folder `record` should be moved to, or None to leave it in place.
 
-                if not self._should_ignore(file_ext):
-                    dest_folder = self._get_destination_folder(
-                        file_ext, formats, output
+        The rules of the config file are tried first. Otherwise, files with an
+        unknown extension (or every file, with `content_detection` set to "all") are
+        identified from their content signature. Files still unknown after that are
+        appended to the `unmatched` list, when one is given.
+        """
+        if record.name in SKIPPEDFILES:
+            return None
+        rule = index.rules.match(record) if index.rules else None
+        if rule is not None:
+            if rule.category == index.IGNORE_KEY:
+                return None
+            # an absolute destination replaces the output folder
+            dest_folder = os.path.join(
+                output, rule.destination or rule.category.lower()
+            )
+            if os.path.join(dest_folder, record.name) == record.path:
+                return None
+            return dest_folder
+        if index.is_ignored(record.ext):
+            return None
+        category = index.category(record.ext)
+        if self.content_detection == "all" or (
+            category is None and self.content_detection == "unknown"
+        ):
+            detected = self.detector.detect_record(record)
+            # a known extension wins over a container signature such as zip
+            if detected is not None and (
+                category is None or not self.detector.is_weak(detected)
+            ):
+                category = index.category(detected) or category
+        if category is None:
+            if unmatched is not None:
+                unmatched.append(record)
+            return None
+        dest_folder = os.path.join(output, category)
+        if os.path.join(dest_folder, record.name) == record.path:
+            return None
+        return dest_folder
+
+    def route_unmatched(self, records, output, mover):
+        """
+        Moves the files no rule matched into the category predicted by `fallback_model`.
+
+        Predictions are made in batches of `FALLBACKBATCHSIZE` files.
+        """
+        from src.model.SVMFileClassifier import file_features
+
+        model = self.fallback_model
+        for start in range(0, len(records), FALLBACKBATCHSIZE):
+            batch = records[start : start + FALLBACKBATCHSIZE]
+            categories = model.predict([file_features(record) for record in batch])
+            for record, category in zip(batch, categories):
+                dest_folder = os.path.join(output, category)
+                if os.path.join(dest_folder, record.name) != record.path:
+                    mover.submit(record.name, record.directory, dest_folder)
+
+    def train_fallback_model(self, directory, model_path=None):
+        """
+        Trains the model routing unknown files on the files of `directory` whose
+        category is known from their extension, and saves it to `model_path`.
+        """
+        from src.model.SVMFileClassifier import file_features
+        from src.model.SVMFileClassifier import SGDFileClassifier
+
+        model_path = model_path or self.model_path
+        index = self.get_routing_index()
+        records, categories = [], []
+        for record in self.scan(
+            directory, hidden=True, extension=index.split_extension
+        ):
+            category = index.category(record.ext)
+            if category is not None and record.name not in SKIPPEDFILES:
+                records.append(record)
+                categories.append(category)
+        if not records:
+            self.console.print(f"No known files to train on in {directory}")
+            return
+        model = SGDFileClassifier()
+        model.fit([file_features(record) for record in records], categories)
+        model.save(model_path)
+        self._fallback_model = model
+        self.console.print(f"Trained on {len(records)} files, saved to {model_path}")
+
+    def watch(self, formats, output, directory, debounce=0.5):
+        """
+        Classifies the files of `directory`, then keeps classifying new files as they
+        are written until interrupted.
+        """
+        self.classify(formats, output, directory)
+        self.console.print(f"Watching {directory}")
+
+        def classify_files(names):
+            index = self.get_routing_index(formats)
+            unmatched = [] if self.fallback_model is not None else None
+            with self.get_mover() as mover:
+                for name in names:
+                    record = FileRecord(
+                        directory,
+                        name,
+                        index.split_extension(name),
+                        None,
+                        None,
+                        None,
+                        None,
                     )
+                    dest_folder = self.route(record, index, output, unmatched)
                     if dest_folder is not None:
-                        try:
-                            self.move_to(file, directory, dest_folder)
-                        except Exception as e:
-                            self.console.print(f"Cannot move file - {file} - {str(e)}")
-                            continue
-        return
+                        mover.submit(record.name, record.directory, dest_folder)
+                if unmatched:
+                    self.route_unmatched(unmatched, output, mover)
+
+        Watcher(directory, classify_files, debounce=debounce).run()
+
+    def get_scan_index(self, index, output, directory):
+        """
+        Opens the incremental scan index stored next to `DIRCONFFILE` in `directory`.
+
+        The index is reset when the routing rules, the content detection, the
+        fallback model, the output folder or the depth changed since it was written,
+        or when `self.full_rescan` is set.
+        """
+        signature = repr(
+            (
+                sorted(index.table.items()),
+                sorted(index.ignored),
+                [
+                    rule._replace(extensions=sorted(rule.extensions))
+                    for rule in index.rules
+                ],
+                os.path.abspath(output),
+                self.max_depth,
+                self.content_detection,
+                self.model_path and os.path.abspath(self.model_path),
+            )
+        )
+        signature = hashlib.sha1(signature.encode("utf-8")).hexdigest()
+        return ScanIndex(
+            os.path.join(directory, DIRINDEXFILE),
+            signature=signature,
+            full_rescan=self.full_rescan,
+        )
+
+    def analyze(self, directory, path=None):
+        """
+        Prints how the files of `directory` split by category, without moving any,
+        and saves the full report (see `Analyzer.analyze`) to `path` if given.
+        """
+        # pandas is only imported by the runs that need it
+        from src.Analyzer import analyze
+        from src.Analyzer import save_report
+        from src.Analyzer import scan_table
+
+        self.console.print("Scanning Files")
+        index = self.get_routing_index()
+        table = scan_table(
+            self.scan(directory, hidden=True, extension=index.split_extension), index
+        )
+        report = analyze(table)
+
+        summary = Table(title=f"{report['files']} files, {report['bytes']} bytes")
+        for column in ("Category", "Files", "Bytes", "% files", "% bytes"):
+            summary.add_column(
+                column, justify="left" if column == "Category" else "right"
+            )
+        for category, row in report["categories"].items():
+            summary.add_row(
+                category,
+                str(row["files"]),
+                str(row["bytes"]),
+                f"{row['percent']:.2f}",
+                f"{row['percent_bytes']:.2f}",
+            )
+        self.console.print(summary)
+        if path:
+            save_report(report, path)
+            self.console.print(f"Report saved to {path}")
+        return report
 
     def classify_by_date(self, date_format, output, directory):
-        creation_dates = self._init_classify_by_date(directory)
-        for file, creation_date in creation_dates:
-            folder = creation_date.format(date_format)
-            folder = os.path.join(output, folder)
-            self.move_to(file, directory, folder)
+        creation_dates = self._init_classify_by_date(directory, output)
+        with self.get_mover() as mover:
+            for record, creation_date in creation_dates:
+                folder = creation_date.format(date_format)
+                folder = os.path.join(output, folder)
+                mover.submit(record.name, record.directory, folder)
 
         return
 
     def classify_by_date_range(
         self, date_format, output, directory, start_date, end_date
     ):
-        creation_dates = self._init_classify_by_date(directory)
-        for file, creation_date in creation_dates:
-            if start_date <= creation_date <= end_date:
-                folder = creation_date.format(date_format)
-                folder = os.path.join(output, folder)
-                self.move_to(file, directory, folder)
+        creation_dates = self._init_classify_by_date(directory, output)
+        with self.get_mover() as mover:
+            for record, creation_date in creation_dates:
+                if start_date <= creation_date <= end_date:
+                    folder = creation_date.format(date_format)
+                    folder = os.path.join(output, folder)
+                    mover.submit(record.name, record.directory, folder)
 
         return
 
-    def _init_classify_by_date(self, directory):
+    def _init_classify_by_date(self, directory, output=None):
         self.console.print("Scanning Files")
-        files = [x for x in os.listdir(directory) if not x.startswith(".")]
-        result = map(
-            lambda x: (
-                x,
-                arrow.get(os.path.getctime(os.path.join(directory, x))),
-            ),
-            files,
+        return (
+            (record, arrow.get(record.ctime)) for record in self.scan(directory, output)
         )
-        self.console.print(result)
-        return result
 
     def classify_by_extension(self, output, directory):
         self.console.print("Scanning Files")
 
-        files = [x for x in os.listdir(directory) if not x.startswith(".")]
-        for file in files:
-            filename, file_ext = os.path.splitext(file)
-            file_ext = file_ext.lower().replace(".", "")
-            folder = file_ext
-            folder = os.path.join(output, folder)
-            self.move_to(file, directory, folder)
+        with self.get_mover() as mover:
+            for record in self.scan(directory, output, stat=False):
+                folder = record.ext
+                folder = os.path.join(output, folder)
+                mover.submit(record.name, record.directory, folder)
 
         return
 
-    def classify_by_size(self, output, directory, size):
+    def classify_by_size(self, output, directory, size=SIZEBUCKETS):
+        """
+        Moves every file into a folder named after its size bucket.
+
+        Args:
+            size (int or list): The bucket boundaries, in bytes. A single boundary
+                splits the files in two buckets.
+        """
         self.console.print("Scanning Files")
+        boundaries = sorted([size] if isinstance(size, int) else size)
+        labels = size_labels(boundaries)
 
-        files = [x for x in os.listdir(directory) if not x.startswith(".")]
-        for file in files:
-            folder = self.size(file, directory, size)
-            folder = os.path.join(output, folder)
-            self.move_to(file, directory, folder)
+        with self.get_mover() as mover:
+            for record in self.scan(directory, output):
+                folder = labels[bisect.bisect_right(boundaries, record.size)]
+                folder = os.path.join(output, folder)
+                mover.submit(record.name, record.directory, folder)
 
         return
 
     def classify_by_size_range(self, output, directory, min_size, max_size):
+        """Moves the files of `min_size` bytes or more, but less than `max_size`."""
         self.console.print("Scanning Files")
+        folder = os.path.join(output, size_labels([min_size, max_size])[1])
 
-        files = [x for x in os.listdir(directory) if not x.startswith(".")]
-        for file in files:
-            folder = self.size_range(file, directory, min_size, max_size)
-            folder = os.path.join(output, folder)
-            self.move_to(file, directory, folder)
+        with self.get_mover() as mover:
+            for record in self.scan(directory, output):
+                if min_size <= record.size < max_size:
+                    mover.submit(record.name, record.directory, folder)
 
         return
 
     def classify_by_author(self, output, directory):
+        """Moves every file into a folder named after the user owning it."""
         self.console.print("Scanning Files")
-
-        files = [x for x in os.listdir(directory) if not x.startswith(".")]
-        for file in files:
-            folder = self.author(file, directory)
-            folder = os.path.join(output, folder)
-            self.move_to(file, directory, folder)
+        owners = {}
+
+        with self.get_mover() as mover:
+            for record in self.scan(directory, output, stat=False):
+                try:
+                    uid = os.stat(record.path).st_uid
+                except OSError:
+                    continue
+                if uid not in owners:
+                    owners[uid] = _owner_name(uid)
+                folder = os.path.join(output, owners[uid])
+                mover.submit(record.name, record.directory, folder)
 
         return
 
     def classify_by_most_recent(self, output, directory, number):
+        """Moves the `number` most recently modified files into "most-recent"."""
         self.console.print("Scanning Files")
-
-        files = [x for x in os.listdir(directory) if not x.startswith(".")]
-        for file in files:
-            folder = self.most_recent(file, directory, number)
-            folder = os.path.join(output, folder)
-            self.move_to(file, directory, folder)
-
+        records = heapq.nlargest(
+            number, self.scan(directory, output), key=lambda record: record.mtime
+        )
+        self._move_all(records, os.path.join(output, "most-recent"))
         return
 
     def classify_by_oldest(self, output, directory, number):
+        """Moves the `number` least recently modified files into "oldest"."""
         self.console.print("Scanning Files")
+        records = heapq.nsmallest(
+            number, self.scan(directory, output), key=lambda record: record.mtime
+        )
+        self._move_all(records, os.path.join(output, "oldest"))
+        return
 
-        files = [x for x in os.listdir(directory) if not x.startswith(".")]
-        for file in files:
-            folder = self.oldest(file, directory, number)
-            folder = os.path.join(output, folder)
-            self.move_to(file, directory, folder)
+    def _move_all(self, records, folder):
+        with self.get_mover() as mover:
+            for record in records:
+                mover.submit(record.name, record.directory, folder)
 
-        return
+    def classify_by_topic_modeling(
+        self, output, directory, extensions=None, model_dir=None, retrain=False
+    ):
+        """
+        Moves every text document into a folder named after its dominant LDA topic.
 
-    def classify_by_topic_modeling(self, output, directory):
+        Phase one trains a single model over the whole corpus (with `LdaMulticore`
+        when `self.workers` > 1) and saves it in `model_dir`, or loads the model
+        saved there by a previous run. Phase two infers the topic of every document
+        in batches.
+        """
         self.console.print("Scanning Files")
+        extensions = extensions or TOPICEXTENSIONS
+        model_dir = model_dir or user_cache_dir(TOPICMODELDIR, directory)
+        topic_modeler = self.topic_modeler
+
+        records = [
+            record
+            for record in self.scan(directory, output, stat=False)
+            if record.ext in extensions
+        ]
+        if not records:
+            return
+        # documents are extracted lazily and capped, only their tokens are kept
+        extractor = TextExtractor()
+        unreadable = set()
+        documents = (
+            self._extract(extractor, record.path, unreadable) for record in records
+        )
+        with self.stats.timer("nlp"):
+            texts = topic_modeler.preprocess_many(documents, processes=self.workers)
+
+        if retrain or not topic_modeler.load(model_dir):
+            self.console.print(f"Training topic model on {len(records)} documents")
+            with self.stats.timer("train"):
+                topic_modeler.fit(texts, workers=self.workers, tokenized=True)
+            topic_modeler.save(model_dir)
+
+        labels = {}
+        topics = self.stats.timed_iter(
+            "infer", topic_modeler.infer(texts, tokenized=True)
+        )
+        with self.get_mover() as mover:
+            for record, topic_id in zip(records, topics):
+                if record.path in unreadable:
+                    continue
+                if topic_id not in labels:
+                    labels[topic_id] = topic_modeler.topic_label(topic_id)
+                folder = os.path.join(output, labels[topic_id])
+                mover.submit(record.name, record.directory, folder)
+
+        return
+
+    def _extract(self, extractor, path, unreadable=None):
+        """
+        Returns the text of `path`, or "" when it cannot be read, adding it to the
+        `unreadable` set if given.
+        """
+        try:
+            return extractor.extract(path)
+        except OSError as e:
+            self.console.print(f"Cannot read file - {path} - {str(e)}")
+            self.stats.count("errors")
+            if unreadable is not None:
+                unreadable.add(path)
+            return ""
+
+    def classify_by_semantic_cluster(
+        self,
+        output,
+        directory,
+        extensions=None,
+        num_clusters=8,
+        cache_dir=None,
+        model_name=None,
+    ):
+        """
+        Moves every text document into a folder named after its semantic cluster.
 
-        files = [x for x in os.listdir(directory) if not x.startswith(".")]
-        for file in files:
-            folder = self.topic_modeling(file)
-            folder = os.path.join(output, folder)
-            self.move_to(file, directory, folder)
+        Documents are embedded with TF-IDF and SVD, or with the local transformer
+        model `model_name`, and grouped with mini-batch k-means. Embeddings are
+        cached in `cache_dir` by content hash, so only new or changed files are
+        extracted and embedded again. `cache_dir` defaults to a folder of the user's
+        cache dedicated to `directory`.
+        """
+        self.console.print("Scanning Files")
+        extensions = extensions or TOPICEXTENSIONS
+        cache_dir = cache_dir or user_cache_dir(EMBEDDINGDIR, directory)
+
+        records = [
+            record
+            for record in self.scan(directory, output, stat=False)
+            if record.ext in extensions
+        ]
+        if not records:
+            return
+        with self.stats.timer("hash"), ThreadPoolExecutor(self.workers) as pool:
+            keys = list(pool.map(_hash_or_none, (record.path for record in records)))
+        # files that vanished or cannot be read are left alone
+        records = [record for record, key in zip(records, keys) if key is not None]
+        keys = [key for key in keys if key is not None]
+        if not records:
+            return
+
+        from src.model.SemanticClusterer import SemanticClusterer
+
+        clusterer = SemanticClusterer(
+            cache_dir, num_clusters=num_clusters, model_name=model_name
+        )
+        missing = clusterer.missing(keys)
+        # identical documents are embedded once
+        new = {}
+        for record, key in zip(records, keys):
+            if key in missing and key not in new:
+                new[key] = record
+        if new:
+            self.console.print(f"Embedding {len(new)} documents")
+            extractor = TextExtractor()
+            with self.stats.timer("embed"):
+                clusterer.embed(
+                    list(new),
+                    (self._extract(extractor, record.path) for record in new.values()),
+                )
+
+        with self.stats.timer("cluster"):
+            labels = clusterer.cluster(keys)
+        with self.get_mover() as mover:
+            for record, label in zip(records, labels):
+                folder = os.path.join(output, f"cluster{label}")
+                mover.submit(record.name, record.directory, folder)
 
         return
 
+    def report_stats(self, path=None):
+        """Prints the per-stage timings and counters, and saves them to `path` if given."""
+        self.console.print(self.stats.table())
+        if path:
+            self.stats.save(path)
+            self.console.print(f"Stats saved to {path}")
+
+    def run(self):
+        """Runs the action selected by the command-line arguments stored in `self.args`."""
+        args = self.args
+        if args.get("version"):
+            self.console.print(f"{VERSION} - {__file__}")
+            return
+        if args.get("types"):
+            for category, extensions in self.file_utility.formats.items():
+                self.console.print(f"{category}: {', '.join(extensions)}")
+            return
+        if args.get("edittypes"):
+            self.open_editor()
+            return
+        if args.get("reset"):
+            self.create_default_config()
+            return
+
+        directory = args.get("directory") or self.path
+        output = args.get("output") or directory
+        if args.get("analyze"):
+            self.analyze(args.get("directory") or self.path, args.get("report"))
+            return
+        if args.get("undo"):
+            self.undo(args["undo"])
+            return
+        if args.get("execute_plan"):
+            self.execute_plan(args["execute_plan"])
+            return
+        if args.get("train_model"):
+            self.train_fallback_model(directory)
+            return
+
+        if args.get("specific_types"):
+            folder = args.get("specific_folder") or "specific"
+            self.classify({folder: args["specific_types"]}, output, directory)
+        elif args.get("date"):
+            date_format = args.get("dateformat") or "YYYY-MM-DD"
+            self.classify_by_date(date_format, output, directory)
+        elif args.get("size"):
+            self.classify_by_size(output, directory, args["size"])
+        elif args.get("size_range"):
+            self.classify_by_size_range(output, directory, *args["size_range"])
+        elif args.get("author"):
+            self.classify_by_author(output, directory)
+        elif args.get("most_recent"):
+            self.classify_by_most_recent(output, directory, args["most_recent"])
+        elif args.get("oldest"):
+            self.classify_by_oldest(output, directory, args["oldest"])
+        elif args.get("watch"):
+            self.watch(self.file_utility.formats, output, directory)
+        elif args.get("topicmodel"):
+            self.classify_by_topic_modeling(output, directory, args.get("extensions"))
+        elif args.get("semantic_cluster"):
+            self.classify_by_semantic_cluster(
+                output,
+                directory,
+                args.get("extensions"),
+                num_clusters=args.get("clusters") or 8,
+                model_name=args.get("embedding_model"),
+            )
+        else:
+            self.classify(self.file_utility.formats, output, directory)
+        if self.plan is not None:
+            self.report_plan(args.get("plan"))
+
     def open_editor(self):
         match PLATFORM:
             case "darwin":
@@ -241,13 +925,7 @@ class Classifier:
         Returns:
             bool: True if the file extension should be ignored, False otherwise.
         """
-        if "IGNORE" in self.file_utility.formats:
-            for ignored in (
-                self.file_utility.formats["IGNORE"].replace("\n", "").split(",")
-            ):
-                if file_ext == ignored:
-                    return True
-        return False
+        return self.get_routing_index().is_ignored(file_ext)
 
     def _get_destination_folder(self, file_ext, formats, output):
         """
@@ -261,15 +939,7 @@ class Classifier:
         Returns:
             str: The destination folder for the file.
         """
-        for folder, ext_list in list(formats.items()):
-            if folder != "IGNORE":
-                folder = os.path.join(output, folder)
-                if type(ext_list) == str:
-                    ext_list = ext_list.split(",")
-                for tmp_ext in ext_list:
-                    if file_ext == tmp_ext:
-                        return folder
-        return None
+        return self.get_routing_index(formats).destination(file_ext, output)
 
     def _format_text_arg(self, arg):
         """Set a date format to name your folders"""
@@ -281,3 +951,36 @@ class Classifier:
         if isinstance(arg, str):
             arg = self._format_text_arg(arg)
         return arg
+
+
+def format_size(size):
+    """Formats a number of bytes with the largest unit dividing it, e.g. "100MB"."""
+    if size == 0:
+        return "0"
+    for unit in ("TB", "GB", "MB", "KB"):
+        if size % SIZEUNITS[unit] == 0:
+            return f"{size // SIZEUNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def size_labels(boundaries):
+    """
+    Returns the folder names of the buckets delimited by the sorted `boundaries`.
+
+    The i-th label is the bucket of the sizes `bisect.bisect_right` puts at i.
+    """
+    bounds = [format_size(boundary) for boundary in boundaries]
+    labels = [f"0-{bounds[0]}"] if bounds else ["all"]
+    labels += [f"{low}-{high}" for low, high in zip(bounds, bounds[1:])]
+    if bounds:
+        labels.append(f"{bounds[-1]}+")
+    return labels
+
+
+def _owner_name(uid):
+    try:
+        import pwd
+
+        return pwd.getpwuid(uid).pw_name
+    except (ImportError, KeyError):
+        return str(uid)
@@ -0,0 +1,168 @@
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from src.TextExtractor import hash_file
+
+# Bytes hashed at each end of a file by the partial hash
+PARTIALBLOCK = 1 << 16
+
+
+class HashCache:
+    """
+    Persistent partial and full content hashes, keyed by (inode, size, mtime).
+
+    A file keeps its inode when it is moved, so its hashes survive classification
+    and are only computed again once the file is modified.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join(
+                os.path.expanduser("~"), ".cache"
+            )
+            path = os.path.join(cache_home, "FileClassifier", "hashes.db")
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or os.curdir, exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS hashes (
+                inode INTEGER,
+                size INTEGER,
+                mtime REAL,
+                kind TEXT,
+                digest TEXT,
+                PRIMARY KEY (inode, size, mtime, kind)
+            )
+            """
+        )
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, record, kind):
+        row = self.connection.execute(
+            "SELECT digest FROM hashes WHERE inode = ? AND size = ? AND mtime = ? "
+            "AND kind = ?",
+            (record.inode, record.size, record.mtime, kind),
+        ).fetchone()
+        return row and row[0]
+
+    def put(self, record, kind, digest):
+        self._pending.append((record.inode, record.size, record.mtime, kind, digest))
+        if len(self._pending) >= 1000:
+            self.flush()
+
+    def flush(self):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)", self._pending
+            )
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+class Deduplicator:
+    """
+    Finds the byte-identical files among `FileRecord`s.
+
+    Candidates are narrowed in three rounds, each only looking at the files that
+    still collide: same size, then same hash of the first and last `PARTIALBLOCK`
+    bytes, then same hash of the whole content. Files are hashed on a pool of
+    `workers` threads and hashes are kept in a `HashCache`. Records must have
+    been scanned with their stat fields.
+    """
+
+    def __init__(self, cache=None, workers=4):
+        self.cache = cache
+        self.workers = max(1, int(workers or 1))
+
+    def groups(self, records):
+        """
+        Returns the lists of identical files, each sorted oldest first.
+
+        Empty files are never reported as duplicates.
+        """
+        by_size = {}
+        for record in records:
+            if record.size:
+                by_size.setdefault(record.size, []).append(record)
+        candidates = [group for group in by_size.values() if len(group) > 1]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for kind in ("partial", "full"):
+                refined = []
+                for group in candidates:
+                    if kind == "full" and group[0].size <= 2 * PARTIALBLOCK:
+                        # the partial hash already covered the whole file
+                        refined.append(group)
+                        continue
+                    by_hash = {}
+                    for record, digest in zip(group, self._hash(pool, group, kind)):
+                        if digest is not None:
+                            by_hash.setdefault(digest, []).append(record)
+                    refined.extend(g for g in by_hash.values() if len(g) > 1)
+                candidates = refined
+        if self.cache is not None:
+            self.cache.flush()
+        return [
+            sorted(group, key=lambda record: (record.mtime, record.path))
+            for group in candidates
+        ]
+
+    def duplicates(self, records):
+        """Returns a {duplicate path: original FileRecord} dictionary."""
+        originals = {}
+        for group in self.groups(records):
+            for record in group[1:]:
+                originals[record.path] = group[0]
+        return originals
+
+    def _hash(self, pool, records, kind):
+        digests = [None] * len(records)
+        missing = []
+        for idx, record in enumerate(records):
+            if self.cache is not None:
+                digests[idx] = self.cache.get(record, kind)
+            if digests[idx] is None:
+                missing.append(idx)
+        hash_fn = partial_hash if kind == "partial" else hash_file
+        paths = (records[idx].path for idx in missing)
+        for idx, digest in zip(missing, pool.map(_safe(hash_fn), paths)):
+            digests[idx] = digest
+            if digest is not None and self.cache is not None:
+                self.cache.put(records[idx], kind, digest)
+        return digests
+
+
+def partial_hash(path):
+    """Hashes the first and last `PARTIALBLOCK` bytes of a file, and its size."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        digest.update(size.to_bytes(8, "little"))
+        digest.update(f.read(PARTIALBLOCK))
+        if size > PARTIALBLOCK:
+            f.seek(max(PARTIALBLOCK, size - PARTIALBLOCK))
+            digest.update(f.read(PARTIALBLOCK))
+    return digest.hexdigest()
+
+
+def _safe(hash_fn):
+    def safe_hash(path):
+        try:
+            return hash_fn(path)
+        except OSError:
+            return None
+
+    return safe_hash
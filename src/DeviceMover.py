@@ -0,0 +1,158 @@
+import errno
+import os
+import shutil
+import threading
+
+# Bytes transferred by a single copy_file_range/sendfile call
+COPYCHUNK = 1 << 24
+# Bytes of cross-device copies allowed in flight at once
+MAXINFLIGHT = 1 << 28
+
+# Errors telling that a zero-copy syscall is not supported for these two files
+_UNSUPPORTED = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EBADF,
+}
+
+
+class DeviceMover:
+    """
+    Moves files with `os.rename`, copying them when they change filesystem.
+
+    Whether a (source device, destination device) pair needs a copy is learned from
+    the first EXDEV error and remembered, so later moves between the two go
+    straight to the copy. A copy is written with `os.copy_file_range` (or
+    `os.sendfile`) to a temporary file next to the destination, gets the mode,
+    times and owner of the source, and is then renamed over the destination, so the
+    destination never holds a partial file. The source is removed last, and only
+    once the copy has all of its bytes.
+
+    Copies may run concurrently from several threads; they wait while more than
+    `max_inflight` bytes are being copied (a larger file is copied alone).
+    """
+
+    def __init__(self, max_inflight=MAXINFLIGHT):
+        self.max_inflight = max_inflight
+        self._cross_device = {}
+        self._folder_devices = {}
+        self._inflight = 0
+        self._condition = threading.Condition()
+
+    def move(self, source, destination, st=None):
+        """
+        Moves the file `source` to `destination`.
+
+        Args:
+            source (str): The file to move.
+            destination (str): Its new path.
+            st (os.stat_result): The stat of `source`, when already known.
+        """
+        if st is None:
+            st = os.stat(source)
+        folder = os.path.dirname(destination) or os.curdir
+        folder_device = self._folder_devices.get(folder)
+        if folder_device is None:
+            folder_device = self._folder_devices[folder] = os.stat(folder).st_dev
+        pair = (st.st_dev, folder_device)
+        if not self._cross_device.get(pair):
+            try:
+                os.rename(source, destination)
+                return
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                self._cross_device[pair] = True
+
+        self._acquire(st.st_size)
+        try:
+            copy_move(source, destination, st)
+        finally:
+            self._release(st.st_size)
+
+    def _acquire(self, size):
+        with self._condition:
+            while self._inflight and self._inflight + size > self.max_inflight:
+                self._condition.wait()
+            self._inflight += size
+
+    def _release(self, size):
+        with self._condition:
+            self._inflight -= size
+            self._condition.notify_all()
+
+
+def copy_move(source, destination, st=None):
+    """Moves `source` to `destination` by copying it, see `DeviceMover`."""
+    if st is None:
+        st = os.stat(source)
+    folder, name = os.path.split(destination)
+    tmp_file = os.path.join(
+        folder, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        with open(source, "rb") as fsrc, open(tmp_file, "wb") as fdst:
+            copy_file(fsrc.fileno(), fdst.fileno())
+            copied = os.fstat(fdst.fileno()).st_size
+            if copied != st.st_size:
+                # a zero-copy call may stop early on some FUSE or special filesystems
+                raise OSError(
+                    errno.EIO,
+                    f"Short copy, {copied} of {st.st_size} bytes",
+                    source,
+                )
+            os.fsync(fdst.fileno())
+        shutil.copystat(source, tmp_file)
+        try:
+            os.chown(tmp_file, st.st_uid, st.st_gid)
+        except (OSError, AttributeError):
+            # only the superuser may give files away
+            pass
+        os.rename(tmp_file, destination)
+    except BaseException:
+        try:
+            os.unlink(tmp_file)
+        except OSError:
+            pass
+        raise
+    os.unlink(source)
+
+
+def copy_file(in_fd, out_fd):
+    """
+    Copies the rest of `in_fd` to `out_fd`, from their current positions.
+
+    The data is copied inside the kernel with `copy_file_range`, or `sendfile`,
+    falling back to read/write when neither supports the two files.
+    """
+    for zero_copy in (_copy_file_range, _sendfile):
+        try:
+            if zero_copy(in_fd, out_fd):
+                return
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+    while True:
+        data = os.read(in_fd, 1 << 20)
+        if not data:
+            return
+        os.write(out_fd, data)
+
+
+def _copy_file_range(in_fd, out_fd):
+    if not hasattr(os, "copy_file_range"):
+        return False
+    while os.copy_file_range(in_fd, out_fd, COPYCHUNK):
+        pass
+    return True
+
+
+def _sendfile(in_fd, out_fd):
+    if not hasattr(os, "sendfile"):
+        return False
+    while os.sendfile(out_fd, in_fd, None, COPYCHUNK):
+        pass
+    return True
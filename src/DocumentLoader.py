@@ -0,0 +1,90 @@
+import codecs
+import mmap
+import os
+
+from src.Scanner import scan
+
+# Documents are capped at this many bytes unless told otherwise
+MAXBYTES = 1 << 20
+# Files larger than this are read through mmap instead of read()
+MMAPTHRESHOLD = 1 << 22
+CHUNKSIZE = 1 << 16
+
+
+def read_document(path, max_bytes=MAXBYTES, sample="head", encoding="utf-8"):
+    """
+    Reads the text of a document, reading at most `max_bytes` bytes of it.
+
+    Large files are memory-mapped so only the sampled pages are ever touched, and
+    the bytes are decoded incrementally, chunk by chunk, ignoring invalid sequences
+    (including a multi-byte character cut by the cap).
+
+    Args:
+        path (str): The file to read.
+        max_bytes (int): Maximum number of bytes to read, None reads everything.
+        sample (str): "head" keeps the start of the file, "headtail" keeps half of
+            the budget from its start and half from its end.
+        encoding (str): The text encoding.
+
+    Returns:
+        str: The decoded text.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if max_bytes is None or size <= max_bytes:
+            ranges = [(0, size)]
+        elif sample == "headtail":
+            half = max_bytes // 2
+            ranges = [(0, half), (size - (max_bytes - half), size)]
+        else:
+            ranges = [(0, max_bytes)]
+
+        if size >= MMAPTHRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                parts = [_decode(view, start, end, encoding) for start, end in ranges]
+        else:
+            parts = []
+            for start, end in ranges:
+                f.seek(start)
+                parts.append(_decode(f.read(end - start), 0, end - start, encoding))
+    return "\n".join(parts)
+
+
+def iter_documents(
+    directory,
+    extensions,
+    max_bytes=MAXBYTES,
+    sample="head",
+    with_records=False,
+    reader=None,
+):
+    """
+    Lazily yields the documents of `directory` whose extension is in `extensions`.
+
+    Only one document is held in memory at a time. `reader(path) -> str` replaces
+    `read_document`, e.g. with `TextExtractor.extract` for PDF or DOCX files.
+
+    Yields:
+        str: The text of each document, or a (FileRecord, str) tuple when
+            `with_records` is set.
+    """
+    for record in scan(directory, hidden=True, stat=False):
+        if record.ext not in extensions:
+            continue
+        try:
+            if reader is None:
+                text = read_document(record.path, max_bytes=max_bytes, sample=sample)
+            else:
+                text = reader(record.path)
+        except OSError:
+            continue
+        yield (record, text) if with_records else text
+
+
+def _decode(buffer, start, end, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+    parts = []
+    for offset in range(start, end, CHUNKSIZE):
+        parts.append(decoder.decode(buffer[offset : min(offset + CHUNKSIZE, end)]))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
@@ -1,8 +1,17 @@
 import mimetypes
 import os
+import shutil
 
 from rich.tree import Tree
 
+from src.DeviceMover import DeviceMover
+from src.DocumentLoader import iter_documents
+from src.DocumentLoader import MAXBYTES
+from src.MagicDetector import MagicDetector
+from src.Scanner import scan
+from src.Scanner import walk
+from src.TextExtractor import TextExtractor
+
 
 class FileUtils:
     formats = {
@@ -181,30 +190,55 @@ class FileUtils:
         "jupyter": [".ipynb_checkpoints"],
     }
 
+    # Folders holding no user file worth classifying: trash, version control, caches
+    # and dependency trees. Build outputs such as bin or dist are not listed, they
+    # are ordinary user folders just as often.
+    pruned = frozenset(
+        {
+            "$RECYCLE.BIN",
+            "System Volume Information",
+            ".Trashes",
+            ".Trash-1000",
+            ".Trash-1001",
+            ".Trash-1002",
+            ".Trash-1003",
+            ".git",
+            ".hg",
+            ".svn",
+            "node_modules",
+            "__pycache__",
+            ".ipynb_checkpoints",
+            ".mypy_cache",
+            ".pytest_cache",
+            ".tox",
+            ".venv",
+            "venv",
+        }
+    )
+
+    _folder_types = None
+
     def __init__(self, path, config, console):
         self.path = path
         self.config = config
         self.console = console
+        self.detector = MagicDetector()
+        self.device_mover = DeviceMover()
 
-    def load_documents(self, directory, extensions):
-        documents = []
-        for file in os.listdir(directory):
-            filename, file_ext = os.path.splitext(file)
-            file_ext = file_ext.lower().replace(".", "")
-
-            if file_ext in extensions and os.path.isfile(os.path.join(directory, file)):
-                with open(
-                    os.path.join(directory, file),
-                    encoding="utf-8",
-                    errors="ignore",
-                ) as f:
-                    documents.append(f.read())
-        return documents
+    def load_documents(self, directory, extensions, max_bytes=MAXBYTES):
+        return iter_documents(
+            directory, extensions, reader=TextExtractor(max_bytes=max_bytes).extract
+        )
 
     def move_to_directory(self, source, destination):
         os.makedirs(destination, exist_ok=True)
         for file in os.listdir(source):
-            os.rename(os.path.join(source, file), os.path.join(destination, file))
+            from_path = os.path.join(source, file)
+            to_path = os.path.join(destination, file)
+            if os.path.isdir(from_path):
+                shutil.move(from_path, to_path)
+            else:
+                self.device_mover.move(from_path, to_path)
         os.rmdir(source)
 
     def remove_directory(self, directory):
@@ -229,11 +263,16 @@ class FileUtils:
             if os.path.isfile(from_file):
                 if not os.path.exists(to_folder):
                     os.makedirs(to_folder)
-                os.rename(from_file, to_file)
+                self.device_mover.move(from_file, to_file)
         return
 
     def get_file_type(self, filename):
         file_type = mimetypes.guess_type(filename)[0]
+        if file_type is None and os.path.isfile(filename):
+            # extensionless or unknown extension, look at the content signature
+            ext = self.detector.detect(filename)
+            if ext is not None:
+                file_type = mimetypes.guess_type(f"file.{ext}")[0]
         file_type = "unknown" if file_type is None else file_type.split("/")[0]
         return file_type
 
@@ -253,14 +292,27 @@ class FileUtils:
         return os.listdir(directory)
 
     def list_files_recursive_with_path(self, directory, level=3):
-        files = []
-        for root, dirs, files in os.walk(directory):
-            level -= 1
-            if level < 0:
-                break
-            for file in files:
-                files.append(os.path.join(root, file))
-        return files
+        return (
+            record.path
+            for record in walk(
+                directory, max_depth=level, prune=self.pruned_folders(), stat=False
+            )
+        )
+
+    @classmethod
+    def folder_types(cls, name):
+        """Returns the types of `folders` listing the folder `name`, or ["other"]."""
+        if cls._folder_types is None:
+            cls._folder_types = {}
+            for folder_type, names in cls.folders.items():
+                for folder_name in names:
+                    cls._folder_types.setdefault(folder_name, []).append(folder_type)
+        return cls._folder_types.get(name, ["other"])
+
+    @classmethod
+    def pruned_folders(cls):
+        """Returns the names of the folders that recursive scans never descend into."""
+        return cls.pruned
 
     def print_tree(self, directory, level=3):
         tree = Tree(directory)
@@ -299,20 +351,15 @@ class FileUtils:
         return os.path.exists(os.path.join(directory, ".git"))
 
     def percentage_of_formats(self, directory):
-        formats = {}
-        for file in os.listdir(directory):
-            filename, file_ext = os.path.splitext(file)
-            file_ext = file_ext.lower().replace(".", "")
-            if file_ext in formats:
-                formats[file_ext] += 1
-            else:
-                formats[file_ext] = 1
-        return formats
+        from src.Analyzer import scan_table
+
+        table = scan_table(scan(directory, hidden=True))
+        return {ext: int(count) for ext, count in table["ext"].value_counts().items()}
 
     def percentage_of_file_types(self, directory):
         file_types = {}
-        for file in os.listdir(directory):
-            file_type = self.get_file_type(file)
+        for record in scan(directory, hidden=True, stat=False):
+            file_type = self.get_file_type(record.path)
             if file_type in file_types:
                 file_types[file_type] += 1
             else:
@@ -322,9 +369,11 @@ class FileUtils:
     def percentage_of_folder_types(self, directory):
         folder_types = {}
         for root, dirs, files in os.walk(directory):
-            for _ in dirs:
-                folder_type = self.folders
-                if folder_type in folder_types:
-                    folder_types[folder_type] += 1
-                else:
-                    folder_types[folder_type] = 1
\ No newline at end of file
+            for name in dirs:
+                # a name such as "target" belongs to several folder types
+                for folder_type in self.folder_types(name):
+                    if folder_type in folder_types:
+                        folder_types[folder_type] += 1
+                    else:
+                        folder_types[folder_type] = 1
+        return folder_types
@@ -0,0 +1,180 @@
+import os
+import threading
+from collections import OrderedDict
+
+HEADER_SIZE = 512
+
+# (offset, signature, extension), every extension is listed in FileUtils.formats once
+# refined by `MagicDetector._refine` ("riff" is only a container)
+SIGNATURES = [
+    (0, b"%PDF-", "pdf"),
+    (0, b"\x89PNG\r\n\x1a\n", "png"),
+    (0, b"\xff\xd8\xff", "jpg"),
+    (0, b"GIF87a", "gif"),
+    (0, b"GIF89a", "gif"),
+    (0, b"II*\x00", "tiff"),
+    (0, b"MM\x00*", "tiff"),
+    (0, b"8BPS", "psd"),
+    (0, b"\x00\x00\x01\x00", "ico"),
+    (0, b"7z\xbc\xaf\x27\x1c", "7z"),
+    (0, b"Rar!\x1a\x07", "rar"),
+    (0, b"\x1f\x8b", "tar.gz"),
+    (0, b"!<arch>\ndebian", "deb"),
+    (0, b"\xed\xab\xee\xdb", "rpm"),
+    (0, b"ID3", "mp3"),
+    (0, b"\xff\xfb", "mp3"),
+    (0, b"\xff\xf3", "mp3"),
+    (0, b"fLaC", "flac"),
+    (0, b"OggS", "ogg"),
+    (0, b"MThd", "mid"),
+    (0, b"#!AMR", "amr"),
+    (0, b"FORM", "aiff"),
+    (0, b"FLV\x01", "flv"),
+    (0, b"\x1a\x45\xdf\xa3", "mkv"),
+    (0, b"MZ", "exe"),
+    (0, b"\x7fELF", "bin"),
+    (0, b"\xca\xfe\xba\xbe", "class"),
+    (0, b"SQLite format 3\x00", "db"),
+    (0, b"{\\rtf", "rtf"),
+    (0, b"%!PS", "ps"),
+    (0, b"OTTO", "otf"),
+    (0, b"\x00\x01\x00\x00\x00", "ttf"),
+    (0, b"wOFF", "woff"),
+    (0, b"wOF2", "woff2"),
+    (0, b"BEGIN:VCARD", "vcf"),
+    (0, b"BEGIN:VCALENDAR", "ics"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "doc"),
+    (0, b"PK\x03\x04", "zip"),
+    (0, b"RIFF", "riff"),
+    (4, b"ftyp", "mp4"),
+]
+
+# Container formats whose real type cannot always be told from the header; a known
+# extension is trusted over them
+WEAK_EXTENSIONS = frozenset({"zip", "doc", "bin", "exe"})
+
+_RIFF = {b"WAVE": "wav", b"AVI ": "avi", b"WEBP": "webp"}
+_FTYP = {b"qt": "mov", b"M4A": "m4a", b"M4V": "m4v", b"3gp": "3gp", b"3g2": "3g2"}
+_ODF = {
+    b"opendocument.text": "odt",
+    b"opendocument.spreadsheet": "ods",
+    b"opendocument.presentation": "odp",
+}
+_OOXML = {b"word/": "docx", b"xl/": "xlsx", b"ppt/": "pptx"}
+_TEXT = [(b"<svg", "svg"), (b"<!doctype html", "html"), (b"<html", "html")]
+
+
+class MagicDetector:
+    """
+    Detects the extension of a file from the signature in its first bytes.
+
+    Only `HEADER_SIZE` bytes are read, with a single `os.read`. Signatures are
+    bucketed by their first byte so a header is compared against a handful of
+    candidates, and results are kept in a bounded LRU cache keyed by
+    (inode, mtime, size), so unchanged files are never read twice.
+    """
+
+    def __init__(self, cache_size=65536):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._by_first_byte = {}
+        self._at_offset = []
+        for offset, signature, ext in SIGNATURES:
+            if offset == 0:
+                self._by_first_byte.setdefault(signature[0], []).append(
+                    (signature, ext)
+                )
+            else:
+                self._at_offset.append((offset, signature, ext))
+
+    def detect(self, path, key=None):
+        """
+        Returns the extension matching the content of `path`, or None.
+
+        Args:
+            path (str): The file to inspect.
+            key (tuple): (inode, mtime, size) of the file, when already known from a
+                scan. Otherwise it is taken from `os.fstat` once the file is open.
+        """
+        if key is not None and None not in key:
+            cached = self._get(key)
+            if cached is not False:
+                return cached
+            key_known = True
+        else:
+            key_known = False
+        try:
+            fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        except OSError:
+            return None
+        try:
+            if not key_known:
+                st = os.fstat(fd)
+                key = (st.st_ino, st.st_mtime, st.st_size)
+                cached = self._get(key)
+                if cached is not False:
+                    return cached
+            header = os.read(fd, HEADER_SIZE)
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
+        ext = self.match(header)
+        self._put(key, ext)
+        return ext
+
+    def detect_record(self, record):
+        """Same as `detect` for a `FileRecord`, reusing its stat fields."""
+        return self.detect(record.path, (record.inode, record.mtime, record.size))
+
+    def match(self, header):
+        """Returns the extension whose signature starts `header`, or None."""
+        if not header:
+            return None
+        for signature, ext in self._by_first_byte.get(header[0], ()):
+            if header.startswith(signature):
+                return self._refine(ext, header)
+        for offset, signature, ext in self._at_offset:
+            if header.startswith(signature, offset):
+                return self._refine(ext, header)
+        lowered = header.lstrip()[:64].lower()
+        for signature, ext in _TEXT:
+            if lowered.startswith(signature):
+                return ext
+        return None
+
+    def is_weak(self, ext):
+        return ext in WEAK_EXTENSIONS
+
+    def _refine(self, ext, header):
+        if ext == "riff":
+            return _RIFF.get(header[8:12])
+        if ext == "mp4":
+            return _FTYP.get(header[8:12].rstrip(b" \x00"), "mp4")
+        if ext == "aiff":
+            return ext if header[8:12] in (b"AIFF", b"AIFC") else None
+        if ext == "mkv" and b"webm" in header:
+            return "webm"
+        if ext == "zip":
+            if header[30:38] == b"mimetype":
+                for marker, odf_ext in _ODF.items():
+                    if marker in header:
+                        return odf_ext
+            for marker, ooxml_ext in _OOXML.items():
+                if marker in header:
+                    return ooxml_ext
+        return ext
+
+    def _get(self, key):
+        with self._lock:
+            if key not in self._cache:
+                return False
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+    def _put(self, key, ext):
+        with self._lock:
+            self._cache[key] = ext
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
@@ -0,0 +1,201 @@
+import collections
+import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.DeviceMover import DeviceMover
+from src.DeviceMover import MAXINFLIGHT
+from src.Stats import NULLSTATS
+
+
+class MoveExecutor:
+    """
+    Moves files with a bounded pool of worker threads.
+
+    Destination folders are created once and remembered, and per-file errors are
+    collected instead of aborting the run; they are reported by `close`. With a
+    single worker every move runs inline, in submission order.
+
+    A file is never moved over an existing file, nor onto the destination of a move
+    submitted before it (e.g. two `readme.txt` from different sub-folders): it is
+    left in place and reported as a collision. Destinations are claimed when moves
+    are submitted: a move onto a claimed destination waits for the moves claiming
+    it, so the first submitted file that can be moved wins whatever the number of
+    workers. Claims are released once the move is done (the file is then there) or
+    skipped, so only the moves in flight are held in memory.
+
+    Files are renamed, or copied when the destination is on another filesystem, see
+    `DeviceMover`; at most `max_inflight_bytes` are being copied at once.
+
+    The destination of the sources passed to `track` is remembered once they have
+    actually been moved, see `destination`.
+
+    Completed moves are recorded in `journal`, a `MoveJournal`, when one is given;
+    sources the journal already lists as done are skipped, and so is the journal
+    itself when it lives in the folder being classified.
+
+    The "move" stage and the moved, skipped, collisions, errors, bytes and syscalls
+    counters are recorded in `stats`.
+
+    Usage:
+        with MoveExecutor(console, workers=8) as mover:
+            mover.submit("file.txt", "inbox", "output/document")
+    """
+
+    def __init__(
+        self,
+        console,
+        workers=1,
+        max_pending=None,
+        verbose=True,
+        journal=None,
+        max_inflight_bytes=MAXINFLIGHT,
+        stats=NULLSTATS,
+    ):
+        self.console = console
+        self.device_mover = DeviceMover(max_inflight_bytes)
+        self.journal = journal
+        self._journal_file = journal and os.path.abspath(journal.path)
+        self.stats = stats
+        self.workers = max(1, int(workers or 1))
+        self.verbose = verbose
+        self.errors = []
+        self.collisions = []
+        self.moved = 0
+        # destination -> moves waiting for the one in flight
+        self._claimed = {}
+        self._created = set()
+        self._tracked = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._slots = None
+        if self.workers > 1:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            self._slots = threading.BoundedSemaphore(max_pending or self.workers * 4)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit(self, filename, from_folder, to_folder):
+        """Schedules `from_folder/filename` to be moved into `to_folder`."""
+        from_file = os.path.join(from_folder, filename)
+        to_file = os.path.join(to_folder, filename)
+        if to_file == from_file:
+            return
+        with self._lock:
+            waiting = self._claimed.get(to_file)
+            if waiting is not None:
+                waiting.append(from_folder)
+                return
+            self._claimed[to_file] = collections.deque()
+        if self._pool is None:
+            self._claimed_move(filename, from_folder, to_folder)
+            return
+        self._slots.acquire()
+        future = self._pool.submit(self._claimed_move, filename, from_folder, to_folder)
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def close(self):
+        """
+        Waits for the pending moves and reports the collisions and errors.
+
+        Returns:
+            list: (source path, exception) tuples for the files that could not be moved.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        if self.journal is not None:
+            self.journal.sync()
+        for source, destination in self.collisions:
+            self.console.print(f"Skipping collision - {source} -> {destination}")
+        for path, error in self.errors:
+            self.console.print(f"Cannot move file - {path} - {str(error)}")
+        return self.errors
+
+    def track(self, source):
+        """Remembers where the file at the path `source` gets moved."""
+        self._tracked[source] = None
+
+    def destination(self, source):
+        """Returns the path the tracked `source` was moved to, None if it was not."""
+        return self._tracked.get(source)
+
+    def makedirs(self, folder):
+        """Creates `folder` unless this executor already did."""
+        if folder in self._created:
+            return
+        os.makedirs(folder, exist_ok=True)
+        self.stats.count("syscalls")
+        with self._lock:
+            self._created.add(folder)
+
+    def _claimed_move(self, filename, from_folder, to_folder):
+        to_file = os.path.join(to_folder, filename)
+        while True:
+            self._move(filename, from_folder, to_folder)
+            with self._lock:
+                waiting = self._claimed[to_file]
+                if not waiting:
+                    del self._claimed[to_file]
+                    return
+                from_folder = waiting.popleft()
+
+    def _move(self, filename, from_folder, to_folder):
+        from_file = os.path.join(from_folder, filename)
+        to_file = os.path.join(to_folder, filename)
+        # to move only files, not folders
+        if to_file == from_file:
+            return
+        if self.journal is not None and (
+            self.journal.is_done(from_file)
+            or os.path.abspath(from_file) == self._journal_file
+        ):
+            self.stats.count("skipped")
+            return
+        self.stats.count("syscalls")
+        try:
+            st = os.stat(from_file)
+        except FileNotFoundError:
+            self.stats.count("skipped")
+            return
+        except OSError as e:
+            with self._lock:
+                self.errors.append((from_file, e))
+            self.stats.count("errors")
+            return
+        if not stat.S_ISREG(st.st_mode):
+            self.stats.count("skipped")
+            return
+        if os.path.lexists(to_file):
+            self._collision(from_file, to_file)
+            return
+        try:
+            self.makedirs(to_folder)
+            with self.stats.timer("move"):
+                self.device_mover.move(from_file, to_file, st)
+        except OSError as e:
+            with self._lock:
+                self.errors.append((from_file, e))
+            self.stats.count("errors")
+            return
+        self.stats.count("moved")
+        self.stats.count("bytes", st.st_size)
+        self.stats.count("syscalls")
+        if self.journal is not None:
+            self.journal.record(from_file, to_file)
+        with self._lock:
+            self.moved += 1
+            if from_file in self._tracked:
+                self._tracked[from_file] = to_file
+        if self.verbose:
+            self.console.print(f"moved: {str(to_file)}")
+
+    def _collision(self, source, destination):
+        with self._lock:
+            self.collisions.append((source, destination))
+        self.stats.count("collisions")
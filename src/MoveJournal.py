@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+
+from src.DeviceMover import DeviceMover
+
+
+class MoveJournal:
+    """
+    Append-only journal of the completed moves, one JSON [source, destination] line
+    per move. Paths are made absolute, so a journal can be undone from anywhere.
+
+    Lines are written as moves complete but only fsync'ed every `sync_every` moves
+    or `sync_interval` seconds, so journaling costs a handful of syscalls per
+    thousand moves. After a crash, at most the last unsynced batch is missing; the
+    files of that batch are no longer at their source, so a resumed run does not
+    see them again either.
+
+    An existing journal is always appended to, never overwritten, so undoing it
+    undoes every run recorded in it. With `resume`, `done` also holds the sources it
+    already lists, and their moves are skipped.
+    """
+
+    def __init__(self, path, resume=False, sync_every=256, sync_interval=1.0):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.done = set()
+        if os.path.isfile(path):
+            if resume:
+                self.done = {source for source, _ in read_journal(path)}
+            _truncate_torn_line(path)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def is_done(self, source):
+        """Tells whether a resumed journal already lists the move of `source`."""
+        return bool(self.done) and os.path.abspath(source) in self.done
+
+    def record(self, source, destination):
+        """Appends the move of `source` to `destination`."""
+        line = json.dumps([os.path.abspath(source), os.path.abspath(destination)])
+        line += "\n"
+        with self._lock:
+            self._file.write(line)
+            self._unsynced += 1
+            if (
+                self._unsynced >= self.sync_every
+                or time.monotonic() - self._synced_at >= self.sync_interval
+            ):
+                self._sync()
+
+    def sync(self):
+        """Forces the recorded moves to disk."""
+        with self._lock:
+            self._sync()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.sync()
+        self._file.close()
+
+    def _sync(self):
+        if self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+
+def read_journal(path):
+    """
+    Returns the (source, destination) moves listed in a journal, oldest first.
+
+    A line cut short by a crash is ignored.
+    """
+    moves = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                source, destination = json.loads(line)
+            except ValueError:
+                continue
+            moves.append((source, destination))
+    return moves
+
+
+def _truncate_torn_line(path):
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        tail = b""
+        while size and b"\n" not in tail:
+            start = max(0, size - len(tail) - 4096)
+            f.seek(start)
+            tail = f.read(size - start)
+            if start == 0:
+                break
+        if tail and not tail.endswith(b"\n"):
+            f.truncate(size - len(tail) + tail.rfind(b"\n") + 1)
+
+
+def undo_journal(path):
+    """
+    Moves the files listed in a journal back to their source, newest first.
+
+    Moves whose destination is gone, or whose source is taken again, are skipped.
+    Files are moved back with a `DeviceMover`, so moves made across filesystems
+    are undone too. Destination folders left empty are removed.
+
+    Returns:
+        tuple: The number of files restored and the list of
+            (destination path, error) tuples of the moves that were not undone.
+    """
+    restored = 0
+    errors = []
+    folders = set()
+    mover = DeviceMover()
+    for source, destination in reversed(read_journal(path)):
+        try:
+            if not os.path.isfile(destination):
+                raise FileNotFoundError("file is gone")
+            if os.path.lexists(source):
+                raise FileExistsError("source path is taken")
+            os.makedirs(os.path.dirname(source), exist_ok=True)
+            mover.move(destination, source)
+        except OSError as e:
+            errors.append((destination, e))
+            continue
+        restored += 1
+        folders.add(os.path.dirname(destination))
+    for folder in sorted(folders, reverse=True):
+        try:
+            os.rmdir(folder)
+        except OSError:
+            pass
+    return restored, errors
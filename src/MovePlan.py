@@ -0,0 +1,149 @@
+import csv
+import json
+import os
+
+
+class MovePlan:
+    """
+    The moves of a classification, computed without touching the disk.
+
+    A plan has the `submit` interface of `MoveExecutor`, so any `classify_by_*` mode
+    can fill one instead of moving files. It records the (source, destination)
+    pairs, the folders that will have to be created, and the collisions: moves onto
+    an existing file, or onto the destination of another move. Colliding moves are
+    left out of the plan, as `MoveExecutor` leaves them out of a real run.
+
+    Usage:
+        with MovePlan() as plan:
+            plan.submit("file.txt", "inbox", "output/document")
+        plan.save("plan.json")
+        MovePlan.load("plan.json").execute(MoveExecutor(console))
+    """
+
+    def __init__(self):
+        self.moves = []
+        self.directories = set()
+        self.collisions = []
+        self.errors = []
+        self._destinations = set()
+        self._folders = {}
+        self._tracked = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return len(self.moves)
+
+    def close(self):
+        return self.errors
+
+    def submit(self, filename, from_folder, to_folder):
+        """Plans moving `from_folder/filename` into `to_folder`."""
+        from_file = os.path.join(from_folder, filename)
+        to_file = os.path.join(to_folder, filename)
+        # to move only files, not folders
+        if to_file == from_file or not os.path.isfile(from_file):
+            return
+        self.add(from_file, to_file)
+
+    def add(self, source, destination):
+        """Plans moving the file `source` to the path `destination`."""
+        if destination in self._destinations or os.path.lexists(destination):
+            self.collisions.append((source, destination))
+            return
+        self._destinations.add(destination)
+        folder = os.path.dirname(destination)
+        if folder not in self._folders:
+            self._folders[folder] = os.path.isdir(folder)
+            if not self._folders[folder]:
+                self.directories.add(folder)
+        self.moves.append((source, destination))
+        if source in self._tracked:
+            self._tracked[source] = destination
+
+    def track(self, source):
+        """Remembers where the file at the path `source` is planned to move."""
+        self._tracked[source] = None
+
+    def destination(self, source):
+        """Returns the planned destination of the tracked `source`, None if none."""
+        return self._tracked.get(source)
+
+    def sorted_moves(self):
+        """Returns the moves grouped by destination folder."""
+        return sorted(self.moves, key=lambda move: os.path.split(move[1]))
+
+    def execute(self, mover):
+        """
+        Runs the plan with `mover`, a `MoveExecutor`.
+
+        Each folder is created once, up front, then the moves are submitted folder
+        by folder so that the entries of one directory are written together. The
+        disk may have changed since the plan was made: a destination that exists by
+        now is added to `collisions` and left alone.
+        """
+        for folder in sorted(self.directories):
+            mover.makedirs(folder)
+        for source, destination in self.sorted_moves():
+            from_folder, filename = os.path.split(source)
+            to_folder, to_filename = os.path.split(destination)
+            if filename != to_filename:
+                raise ValueError(f"Cannot rename {source} to {destination}")
+            if os.path.lexists(destination):
+                self.collisions.append((source, destination))
+                continue
+            mover.submit(filename, from_folder, to_folder)
+
+    def save(self, path):
+        """Writes the plan to `path`, as CSV when it ends with .csv, else as JSON."""
+        if path.lower().endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["action", "source", "destination"])
+                for folder in sorted(self.directories):
+                    writer.writerow(["mkdir", "", folder])
+                for source, destination in self.sorted_moves():
+                    writer.writerow(["move", source, destination])
+                for source, destination in self.collisions:
+                    writer.writerow(["collision", source, destination])
+            return
+        with open(path, "w") as f:
+            json.dump(
+                {
+                    "moves": self.sorted_moves(),
+                    "directories": sorted(self.directories),
+                    "collisions": self.collisions,
+                },
+                f,
+                indent=2,
+            )
+
+    @classmethod
+    def load(cls, path):
+        """Reads a plan written by `save`."""
+        plan = cls()
+        if path.lower().endswith(".csv"):
+            with open(path, newline="") as f:
+                rows = [
+                    (row["action"], row["source"], row["destination"])
+                    for row in csv.DictReader(f)
+                ]
+        else:
+            with open(path) as f:
+                data = json.load(f)
+            rows = [("mkdir", "", folder) for folder in data["directories"]]
+            rows += [("move", *move) for move in data["moves"]]
+            rows += [("collision", *move) for move in data["collisions"]]
+        for action, source, destination in rows:
+            if action == "mkdir":
+                plan.directories.add(destination)
+            elif action == "move":
+                plan.moves.append((source, destination))
+                plan._destinations.add(destination)
+            elif action == "collision":
+                plan.collisions.append((source, destination))
+        return plan
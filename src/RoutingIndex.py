@@ -0,0 +1,205 @@
+import os
+import re
+from types import MappingProxyType
+
+from src.RuleEngine import is_rule
+from src.RuleEngine import parse_rule
+from src.RuleEngine import RuleSet
+
+# The colon ending a category name, not the one of a Windows drive such as C:\
+_SEPARATOR = re.compile(r":(?![\\/])")
+
+
+class RoutingIndex:
+    """
+    Compiled, read-only extension -> category lookup table.
+
+    The table is built once from `FileUtils.formats` plus the overrides found in
+    `.classifier-master.conf` so that routing a file is a dictionary lookup instead
+    of a scan over every category. Compound suffixes such as `tar.gz` are matched
+    longest-first, which `os.path.splitext` cannot do.
+
+    Extensions listed in several categories are resolved in this order: categories
+    from the config file, then `PRIORITY`, then the first declared category (as the
+    linear scan used to do).
+
+    Config lines using globs, regexes, size or age bounds or a destination are
+    compiled into `rules`, a `RuleSet` checked before the extension table.
+    """
+
+    PRIORITY = {
+        "py": "executable",
+        "cgi": "executable",
+        "odp": "document",
+        "png": "image",
+    }
+
+    IGNORE_KEY = "IGNORE"
+
+    def __init__(self, table, ignored=(), rules=()):
+        self._table = MappingProxyType(dict(table))
+        self._ignored = frozenset(ignored)
+        self.rules = RuleSet(rules)
+        self._max_parts = max((ext.count(".") + 1 for ext in self._table), default=1)
+
+    @classmethod
+    def from_formats(cls, formats, overrides=None, priority=None, rules=()):
+        """
+        Compiles an index from a formats dictionary.
+
+        Args:
+            formats (dict): Category name -> list (or comma-separated string) of extensions.
+            overrides (dict): Categories read from the user config. They replace the
+                built-in category with the same (case-insensitive) name and take
+                precedence over the built-in categories.
+            priority (dict): Extension -> category used to settle duplicates.
+            rules (list): `Rule`s checked before the extension table.
+
+        Returns:
+            RoutingIndex: The compiled index.
+        """
+        priority = cls.PRIORITY if priority is None else priority
+        overrides = overrides or {}
+        ignored = set()
+        categories = {}
+
+        for source in (formats, overrides):
+            for category, extensions in source.items():
+                extensions = _normalize_extensions(extensions)
+                if category == cls.IGNORE_KEY:
+                    ignored.update(extensions)
+                    continue
+                categories[category.lower()] = extensions
+
+        overridden = [
+            category.lower() for category in overrides if category != cls.IGNORE_KEY
+        ]
+        order = overridden + [c for c in categories if c not in overridden]
+        table = {}
+        for category in order:
+            for ext in categories[category]:
+                table.setdefault(ext, category)
+        for ext, category in priority.items():
+            if ext in categories.get(category, ()) and table[ext] not in overridden:
+                table[ext] = category
+
+        return cls(table, ignored, rules)
+
+    @classmethod
+    def from_config(cls, formats, config):
+        """Compiles an index from `formats` and the overrides and rules in `config`."""
+        if not config or not os.path.isfile(config):
+            return cls.from_formats(formats)
+        return cls.from_formats(
+            formats, parse_config(config), rules=parse_rules(config)
+        )
+
+    @property
+    def table(self):
+        return self._table
+
+    @property
+    def ignored(self):
+        return self._ignored
+
+    def split_extension(self, filename):
+        """
+        Returns the longest known extension of `filename`, lower-cased and without dot.
+
+        Falls back to the last suffix when no compound extension is known.
+        """
+        name = filename.lower()
+        parts = name.split(".")
+        if len(parts) < 2 or parts == ["", parts[-1]]:
+            return ""
+        for depth in range(min(self._max_parts, len(parts) - 1), 1, -1):
+            ext = ".".join(parts[-depth:])
+            if ext in self._table:
+                return ext
+        return parts[-1]
+
+    def category(self, file_ext):
+        """Returns the category of an extension, or None when it is unknown."""
+        return self._table.get(file_ext)
+
+    def is_ignored(self, file_ext):
+        return file_ext in self._ignored
+
+    def destination(self, file_ext, output):
+        """
+        Returns the destination folder of an extension inside `output`.
+
+        Args:
+            file_ext (str): The file extension, lower-cased and without dot.
+            output (str): The output directory.
+
+        Returns:
+            str: The destination folder, or None when the extension is unknown.
+        """
+        category = self._table.get(file_ext)
+        if category is None:
+            return None
+        return os.path.join(output, category)
+
+
+def _normalize_extensions(extensions):
+    if isinstance(extensions, str):
+        extensions = extensions.split(",")
+    normalized = []
+    for ext in extensions:
+        ext = ext.strip().lower().lstrip(".")
+        if ext:
+            normalized.append(ext)
+    return normalized
+
+
+def parse_config(config):
+    """
+    Reads the `Category: ext1, ext2` lines of a config file.
+
+    Only the first colon that does not start a path (`C:\\`) separates the category
+    from its extensions. Rule lines are left to `parse_rules`.
+
+    Returns:
+        dict: Category name -> list of extensions, in file order.
+    """
+    return {
+        key: _normalize_extensions(val)
+        for key, val in _read_config(config)
+        if not is_rule(val)
+    }
+
+
+def parse_rules(config):
+    """
+    Reads the rule lines of a config file, e.g.
+    `Invoices: *invoice*.pdf, re:^INV-\\d+, age<1y -> D:\\Finance`.
+
+    Returns:
+        list: The `Rule`s, in file order.
+
+    Raises:
+        ValueError: A rule line cannot be parsed, the message names the line.
+    """
+    rules = []
+    for key, val in _read_config(config):
+        if not is_rule(val):
+            continue
+        try:
+            rules.append(parse_rule(key, val))
+        except ValueError as e:
+            raise ValueError(
+                f'Invalid rule "{key}: {val.strip()}" in {config}: {e}'
+            ) from e
+    return rules
+
+
+def _read_config(config):
+    with open(config, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = _SEPARATOR.split(line, maxsplit=1)
+            if len(parts) == 2:
+                yield parts[0].strip(), parts[1]
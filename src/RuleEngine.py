@@ -0,0 +1,230 @@
+import bisect
+import fnmatch
+import heapq
+import itertools
+import os
+import re
+import time
+from typing import NamedTuple
+from typing import Optional
+
+SIZEUNITS = {"": 1, "B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30, "TB": 1 << 40}
+AGEUNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400, "y": 365 * 86400}
+
+_SIZE = re.compile(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?B?)\s*", re.IGNORECASE)
+_AGE = re.compile(r"\s*(\d+(?:\.\d+)?)\s*([smhdwy]?)\s*")
+_PREDICATE = re.compile(r"(size|age)\s*(<=|>=|<|>)\s*(.+)", re.IGNORECASE)
+_GLOB_CHARS = re.compile(r"[*?\[]")
+# items are separated by commas, except inside regex quantifiers such as {1,3}
+_ITEM_SEPARATOR = re.compile(r",(?![^{]*\})")
+
+
+class Rule(NamedTuple):
+    """
+    A routing rule read from a config line.
+
+    A file matches when its extension is in `extensions`, or its name matches one
+    of `patterns` (globs and regexes), and its size and age are within bounds.
+    Matching files go to `destination`, or to the `category` folder of the output.
+    """
+
+    category: str
+    extensions: frozenset
+    patterns: tuple
+    destination: Optional[str] = None
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+    min_age: Optional[float] = None
+    max_age: Optional[float] = None
+
+    @property
+    def needs_stat(self):
+        bounds = (self.min_size, self.max_size, self.min_age, self.max_age)
+        return any(bound is not None for bound in bounds)
+
+    def accepts(self, record, now):
+        """Checks the size and age bounds of the rule against `record`."""
+        if self.min_size is not None and not record.size >= self.min_size:
+            return False
+        if self.max_size is not None and not record.size < self.max_size:
+            return False
+        if self.min_age is not None or self.max_age is not None:
+            age = now - record.mtime
+            if self.min_age is not None and not age >= self.min_age:
+                return False
+            if self.max_age is not None and not age < self.max_age:
+                return False
+        return True
+
+
+class RuleSet:
+    """
+    Rules compiled into a single matcher.
+
+    The patterns of every rule are merged into one regex alternation with a named
+    group per rule, and literal extensions are kept in a hash table, so matching a
+    file name costs one regex match and one dict lookup however many rules there
+    are. Rules are tried in declaration order; the first accepting one wins.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.needs_stat = any(rule.needs_stat for rule in self.rules)
+        self.ages = any(
+            rule.min_age is not None or rule.max_age is not None for rule in self.rules
+        )
+        self._by_ext = {}
+        self._patterns = {}
+        # rules without extension nor pattern apply to every file
+        self._any_name = []
+        alternatives = []
+        for idx, rule in enumerate(self.rules):
+            if not rule.extensions and not rule.patterns:
+                self._any_name.append(idx)
+            for ext in rule.extensions:
+                self._by_ext.setdefault(ext, []).append(idx)
+            if rule.patterns:
+                pattern = "|".join(f"(?:{pattern})" for pattern in rule.patterns)
+                self._patterns[idx] = re.compile(pattern, re.IGNORECASE)
+                alternatives.append(f"(?P<r{idx}>{pattern})")
+        self._pattern_indices = sorted(self._patterns)
+        self._combined = (
+            re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+        )
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def match(self, record, now=None):
+        """
+        Returns the first `Rule` matching the `FileRecord` `record`, or None.
+
+        A record scanned without its stat fields is stat-ed when a candidate rule
+        has size or age bounds.
+        """
+        candidates = self._any_name + self._by_ext.get(record.ext, [])
+        later = ()
+        if self._combined is not None:
+            found = self._combined.match(record.name)
+            if found is not None:
+                first_pattern = int(found.lastgroup[1:])
+                candidates.append(first_pattern)
+                # the alternation only reports the first matching pattern rule, the
+                # later ones are tested on their own if the pass reaches them
+                start = bisect.bisect_right(self._pattern_indices, first_pattern)
+                later = itertools.islice(self._pattern_indices, start, None)
+        if not candidates:
+            return None
+        if record.mtime is None and self.needs_stat:
+            try:
+                st = os.stat(os.path.join(record.directory, record.name))
+            except OSError:
+                return None
+            record = record._replace(
+                size=st.st_size, ctime=st.st_ctime, mtime=st.st_mtime
+            )
+        now = time.time() if now is None else now
+        matched = set(candidates)
+        previous = None
+        # a single pass in declaration order over every rule that may match
+        for idx in heapq.merge(sorted(matched), later):
+            if idx == previous:
+                continue
+            previous = idx
+            if idx not in matched and not self._patterns[idx].match(record.name):
+                continue
+            if self.rules[idx].accepts(record, now):
+                return self.rules[idx]
+        return None
+
+
+def parse_size(text):
+    """Parses a size such as "512", "10KB" or "1.5GB" into bytes."""
+    match = _SIZE.fullmatch(text)
+    if match is None:
+        raise ValueError(f"Invalid size: {text}")
+    return int(float(match.group(1)) * SIZEUNITS[match.group(2).upper()])
+
+
+def parse_age(text):
+    """Parses an age such as "90", "12h" or "30d" into seconds (days by default)."""
+    match = _AGE.fullmatch(text)
+    if match is None:
+        raise ValueError(f"Invalid age: {text}")
+    return float(match.group(1)) * AGEUNITS[match.group(2) or "d"]
+
+
+def is_rule(value):
+    """Tells whether the value of a config line needs a `Rule` (not only extensions)."""
+    if "->" in value:
+        return True
+    return any(
+        _GLOB_CHARS.search(item)
+        or item.strip().startswith("re:")
+        or _PREDICATE.fullmatch(item.strip())
+        for item in _ITEM_SEPARATOR.split(value)
+    )
+
+
+def parse_rule(category, value):
+    """
+    Compiles the value of a config line into a `Rule`.
+
+    The value is a comma-separated list of items, optionally followed by
+    `-> destination`:
+
+    - `pdf`: a literal extension
+    - `*invoice*.pdf`: a glob on the file name
+    - `re:^INV-\\d+`: a regex searched in the file name, without capturing groups
+      (use `(?:...)`) since the regexes of all rules are merged into one
+    - `size>10MB`, `size<=1GB`, `age<30d`, `age>=1y`: size and age bounds
+
+    Raises:
+        ValueError: An item cannot be parsed, or a regex has a (named) group.
+    """
+    destination = None
+    if "->" in value:
+        value, _, destination = value.rpartition("->")
+        destination = os.path.expanduser(destination.strip()) or None
+    extensions = set()
+    patterns = []
+    bounds = {}
+    for item in _ITEM_SEPARATOR.split(value):
+        item = item.strip()
+        if not item:
+            continue
+        predicate = _PREDICATE.fullmatch(item)
+        if item.startswith("re:"):
+            pattern = item[3:].strip()
+            try:
+                compiled = re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Invalid regex: {item} ({e})") from e
+            if compiled.groups:
+                raise ValueError(
+                    f"Groups are not supported in rule regexes, use (?:...): {item}"
+                )
+            patterns.append(f".*?(?:{pattern})")
+        elif predicate is not None:
+            kind, operator, amount = predicate.groups()
+            kind = kind.lower()
+            amount = parse_size(amount) if kind == "size" else parse_age(amount)
+            if operator in (">", "<="):
+                # bounds are [min, max): sizes are whole bytes, ages are floats
+                amount += 1 if kind == "size" else 1e-9
+            bound = "min" if operator in (">", ">=") else "max"
+            bounds[f"{bound}_{kind}"] = amount
+        elif _GLOB_CHARS.search(item):
+            patterns.append(fnmatch.translate(item))
+        else:
+            extensions.add(item.lower().lstrip("."))
+    return Rule(
+        category,
+        frozenset(extensions),
+        tuple(patterns),
+        destination,
+        **bounds,
+    )
@@ -0,0 +1,109 @@
+import sqlite3
+
+
+class ScanIndex:
+    """
+    On-disk record of what previous runs already examined in a directory.
+
+    Files that were left in place (unknown or ignored extension, already in their
+    destination) are stored with their size, mtime and inode, so the next run can
+    skip them while they are unchanged. Directory mtimes are stored as well: a
+    directory whose mtime did not change since the last run gained or lost no file,
+    so its files do not need to be looked at again. A file rewritten in place does
+    not change it though, so this only holds when files are routed by name alone.
+
+    The index is reset whenever the routing signature (rules and output folder)
+    changes, or when `full_rescan` is requested.
+    """
+
+    def __init__(self, path, signature="", full_rescan=False):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # keep the journal file around, creating and deleting it would change the
+        # mtime of the indexed directory on every run
+        self.connection.execute("PRAGMA journal_mode=PERSIST")
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime REAL,
+                inode INTEGER,
+                category TEXT
+            );
+            CREATE TABLE IF NOT EXISTS directories (
+                path TEXT PRIMARY KEY,
+                mtime INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            """
+        )
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'signature'"
+        ).fetchone()
+        if full_rescan or row is None or row[0] != signature:
+            self.reset(signature)
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def reset(self, signature=""):
+        """Forgets every file and directory."""
+        with self.connection:
+            self.connection.execute("DELETE FROM files")
+            self.connection.execute("DELETE FROM directories")
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('signature', ?)", (signature,)
+            )
+
+    def unchanged(self, record):
+        """Returns True if `record` was already examined and has not changed since."""
+        row = self.connection.execute(
+            "SELECT size, mtime, inode FROM files WHERE path = ?", (record.path,)
+        ).fetchone()
+        return row is not None and row == (record.size, record.mtime, record.inode)
+
+    def remember(self, record, category):
+        """Records that `record` was examined and left in place."""
+        self._pending.append(
+            (record.path, record.size, record.mtime, record.inode, category)
+        )
+        if len(self._pending) >= 1000:
+            self.flush()
+
+    def directory_unchanged(self, path, mtime):
+        row = self.connection.execute(
+            "SELECT mtime FROM directories WHERE path = ?", (path,)
+        ).fetchone()
+        return row is not None and row[0] == mtime
+
+    def remember_directories(self, directories):
+        """
+        Stores the (path, mtime) of the examined directories.
+
+        The mtime must be the one read when the directory was listed: a file added
+        after the listing then changes it, and the next run looks again.
+        """
+        self.flush()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO directories VALUES (?, ?)", directories
+            )
+
+    def flush(self):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", self._pending
+            )
+        self._pending = []
+
+    def close(self):
+        self.flush()
+        self.connection.close()
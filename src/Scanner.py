@@ -0,0 +1,149 @@
+import os
+import time
+from typing import NamedTuple
+from typing import Optional
+
+from src.Stats import NULLSTATS
+
+
+class FileRecord(NamedTuple):
+    """A regular file found by `scan`. Stat fields are None when `stat=False`."""
+
+    directory: str
+    name: str
+    ext: str
+    size: Optional[int]
+    ctime: Optional[float]
+    mtime: Optional[float]
+    inode: int
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, self.name)
+
+
+def split_extension(filename):
+    """Returns the last extension of `filename`, lower-cased and without dot."""
+    return os.path.splitext(filename)[1].lower().replace(".", "")
+
+
+def scan(directory, hidden=False, stat=True, extension=split_extension):
+    """
+    Lists the regular files of `directory` with a single `os.scandir` pass.
+
+    The entry type comes from the directory listing itself and each file is stat-ed
+    at most once (never on Windows, where `scandir` already returns the stat data),
+    so callers should use the record fields instead of calling `os.path.get*`.
+
+    Args:
+        directory (str): The directory to scan.
+        hidden (bool): Whether to include files whose name starts with a dot.
+        stat (bool): Whether to fill the size, ctime and mtime fields.
+        extension (callable): Extracts the extension from a file name.
+
+    Yields:
+        FileRecord: One record per regular file, in directory order.
+    """
+    return walk(directory, 0, hidden=hidden, stat=stat, extension=extension)
+
+
+def walk(
+    directory,
+    max_depth=None,
+    prune=(),
+    exclude=(),
+    hidden=False,
+    stat=True,
+    extension=split_extension,
+    visit=None,
+    stats=NULLSTATS,
+):
+    """
+    Recursively yields the regular files below `directory`, one directory at a time.
+
+    Nothing but the stack of pending directories is kept in memory, so the records
+    can be streamed straight into the move stage on arbitrarily large trees.
+
+    Args:
+        directory (str): The directory to walk.
+        max_depth (int): How many levels of sub-directories to descend into. 0 only
+            lists `directory` itself and None has no limit.
+        prune (iterable): Directory names that are never descended into.
+        exclude (iterable): Directory paths that are never descended into.
+        hidden (bool): Whether to include files and folders starting with a dot.
+        stat (bool): Whether to fill the size, ctime and mtime fields.
+        extension (callable): Extracts the extension from a file name.
+        visit (callable): Called with the path and `st_mtime_ns` of every directory
+            before it is listed. When it returns False the files of that directory
+            are not yielded, but its sub-directories are still walked.
+        stats (Stats): Receives the "stat" stage and the directories, scanned and
+            syscalls counters.
+
+    Yields:
+        FileRecord: One record per regular file.
+    """
+    prune = frozenset(prune)
+    exclude = frozenset(os.path.abspath(path) for path in exclude)
+    timing = stats.enabled
+    stack = [(directory, 0)]
+    while stack:
+        current, depth = stack.pop()
+        try:
+            files = visit is None or visit(current, os.stat(current).st_mtime_ns)
+            if not files and max_depth is not None and depth >= max_depth:
+                # nothing to yield and nothing to descend into
+                continue
+            entries = os.scandir(current)
+        except OSError:
+            if current == directory:
+                raise
+            continue
+        subdirs = []
+        scanned = stat_calls = 0
+        stat_seconds = 0.0
+        with entries:
+            for entry in entries:
+                if not hidden and entry.name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if max_depth is None or depth < max_depth:
+                            subdirs.append(entry)
+                        continue
+                    if not files or not entry.is_file():
+                        continue
+                    if stat:
+                        if timing:
+                            start = time.perf_counter()
+                            st = entry.stat()
+                            stat_seconds += time.perf_counter() - start
+                            stat_calls += 1
+                        else:
+                            st = entry.stat()
+                        size, ctime, mtime = st.st_size, st.st_ctime, st.st_mtime
+                    else:
+                        size = ctime = mtime = None
+                    inode = entry.inode()
+                except OSError:
+                    # the file vanished or cannot be stat-ed, skip it like listdir users did
+                    continue
+                scanned += 1
+                yield FileRecord(
+                    current,
+                    entry.name,
+                    extension(entry.name),
+                    size,
+                    ctime,
+                    mtime,
+                    inode,
+                )
+        if timing:
+            if stat_calls:
+                stats.add_time("stat", stat_seconds, stat_calls)
+            stats.count("directories")
+            stats.count("scanned", scanned)
+            stats.count("syscalls", 1 + (visit is not None) + stat_calls)
+        for entry in reversed(subdirs):
+            if entry.name in prune or os.path.abspath(entry.path) in exclude:
+                continue
+            stack.append((entry.path, depth + 1))
@@ -0,0 +1,182 @@
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextlib import nullcontext
+
+from rich.table import Table
+
+# Prefix of the Prometheus metric names
+METRICPREFIX = "fileclassifier"
+
+
+class Stats:
+    """
+    Per-stage timers and counters of a run.
+
+    Stages are timed with `timer`, `timed` (a wrapped function) or `timed_iter` (the
+    time spent producing the items of an iterator), and accumulate their seconds and
+    calls. Counters such as files scanned, moved, skipped, errors, bytes and
+    syscalls are added with `count`. Both are safe to update from several threads.
+
+    Stages timed on several threads (such as the moves of the worker pool) add up
+    the time of every thread, so their seconds can exceed the wall-clock run time.
+
+    A disabled instance (see `NULLSTATS`) records nothing and its wrappers return
+    what they were given, so instrumented code costs nothing unless asked for.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.timers = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add_time(self, stage, seconds, calls=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self.timers.setdefault(stage, [0.0, 0])
+            timer[0] += seconds
+            timer[1] += calls
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def timer(self, stage):
+        """Returns a context manager adding the time spent in its block to `stage`."""
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(stage)
+
+    @contextmanager
+    def _timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def timed(self, stage, fn):
+        """Wraps `fn` so that every call is added to `stage`."""
+        if not self.enabled:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add_time(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    def timed_iter(self, stage, iterable):
+        """
+        Yields the items of `iterable`, adding the time spent producing them (not the
+        time the consumer spends on them) to `stage`.
+        """
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(stage, iterable)
+
+    def _timed_iter(self, stage, iterable):
+        iterator = iter(iterable)
+        seconds = 0.0
+        calls = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    seconds += time.perf_counter() - start
+                    return
+                seconds += time.perf_counter() - start
+                calls += 1
+                yield item
+        finally:
+            self.add_time(stage, seconds, calls)
+
+    def to_dict(self):
+        """Returns the stages (seconds, calls) and counters, and the total run time."""
+        with self._lock:
+            return {
+                "seconds": round(time.perf_counter() - self.started, 6),
+                "stages": {
+                    stage: {"seconds": round(seconds, 6), "calls": calls}
+                    for stage, (seconds, calls) in self.timers.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+    def to_prometheus(self, prefix=METRICPREFIX):
+        """Returns the stats in the Prometheus text exposition format."""
+        data = self.to_dict()
+        lines = [
+            f"# TYPE {prefix}_run_seconds gauge",
+            f"{prefix}_run_seconds {data['seconds']}",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        for stage, timer in data["stages"].items():
+            lines.append(
+                f'{prefix}_stage_seconds_total{{stage="{stage}"}} {timer["seconds"]}'
+            )
+        lines.append(f"# TYPE {prefix}_stage_calls_total counter")
+        for stage, timer in data["stages"].items():
+            lines.append(
+                f'{prefix}_stage_calls_total{{stage="{stage}"}} {timer["calls"]}'
+            )
+        for name, value in data["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def save(self, path):
+        """
+        Writes the stats to `path`, in the Prometheus text format when it ends with
+        .prom or .txt, else as JSON.
+        """
+        with open(path, "w") as f:
+            if path.lower().endswith((".prom", ".txt")):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+
+    def table(self):
+        """
+        Returns a rich table of the stages, slowest first, and of the counters.
+
+        Stage seconds are summed over threads, their share is relative to the
+        wall-clock run time and may exceed 100% for stages run in parallel.
+        """
+        data = self.to_dict()
+        total = data["seconds"]
+        table = Table(
+            title=f"Run statistics ({total:.2f}s wall clock)",
+            caption="Stage times are summed over all threads",
+        )
+        table.add_column("Stage / counter")
+        table.add_column("Seconds (summed)", justify="right")
+        table.add_column("% of wall clock", justify="right")
+        table.add_column("Calls / value", justify="right")
+        stages = sorted(
+            data["stages"].items(), key=lambda item: item[1]["seconds"], reverse=True
+        )
+        for stage, timer in stages:
+            share = 100 * timer["seconds"] / total if total else 0.0
+            table.add_row(
+                stage, f"{timer['seconds']:.3f}", f"{share:.1f}", str(timer["calls"])
+            )
+        for name, value in sorted(data["counters"].items()):
+            table.add_row(name, "", "", str(value))
+        return table
+
+
+NULLSTATS = Stats(enabled=False)
@@ -0,0 +1,235 @@
+import hashlib
+import html
+import os
+import re
+import zipfile
+import zlib
+
+from src.DocumentLoader import CHUNKSIZE
+from src.DocumentLoader import MAXBYTES
+from src.DocumentLoader import read_document
+from src.Scanner import split_extension
+
+_TAG = re.compile(r"<[^>]+>")
+_BREAK = re.compile(
+    r"</(?:w:p|a:p|text:p|text:h)>|<(?:w:br|w:tab|text:line-break)\b[^>]*/>"
+)
+_PDF_STREAM = re.compile(rb"stream\r?\n(.*?)\r?\nendstream", re.S)
+_PDF_TEXT = re.compile(rb"\[(.*?)\]\s*TJ|(\((?:\\.|[^\\)])*\))\s*(?:Tj|'|\")", re.S)
+_PDF_STRING = re.compile(rb"\((?:\\.|[^\\)])*\)", re.S)
+_PDF_ESCAPE = re.compile(rb"\\([nrtbf()\\]|[0-7]{1,3})")
+_PDF_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"", b"f": b""}
+_RTF_CONTROL = re.compile(r"\\[a-z]+-?\d* ?|\\'[0-9a-f]{2}|[{}]", re.I)
+_PRINTABLE_UTF16 = re.compile(rb"(?:[\x20-\x7e]\x00){4,}")
+_PRINTABLE = re.compile(rb"[\x20-\x7e]{4,}")
+
+# Bytes read from a single zip member, guards against zip bombs
+ZIPMEMBERLIMIT = 1 << 26
+# Bytes of a document read by the PDF (without pypdf), RTF and strings backends
+READLIMIT = 1 << 26
+# Bytes of extracted text kept in the cache, the least recently used go first
+MAXCACHEBYTES = 1 << 30
+
+# Members of zip-based documents holding their text
+_ZIP_MEMBERS = {
+    "docx": re.compile(r"word/(document|header\d*|footer\d*|footnotes)\.xml$"),
+    "pptx": re.compile(r"ppt/slides/slide\d+\.xml$"),
+    "xlsx": re.compile(r"xl/sharedStrings\.xml$"),
+    "odt": re.compile(r"content\.xml$"),
+    "ods": re.compile(r"content\.xml$"),
+    "odp": re.compile(r"content\.xml$"),
+}
+
+
+class TextExtractor:
+    """
+    Extracts plain text from the document formats of `FileUtils.formats["document"]`.
+
+    Every backend works offline in pure Python: zip-based formats (docx, xlsx,
+    pptx, odt, ods, odp) are unpacked with `zipfile`, PDF content streams are
+    inflated with `zlib` (`pypdf` is used instead when it is installed), RTF control
+    words are stripped and legacy binary Office files fall back to their printable
+    strings. Other extensions are read as text. Backends can be replaced with
+    `register`.
+
+    Text extracted by a backend is cached on disk under `cache_dir`, keyed by the
+    hash of the file content, the backend and `max_bytes`, so unchanged documents
+    are only extracted once. The cache is trimmed to its `max_cache_bytes` most
+    recently used bytes the first time an instance writes to it.
+    """
+
+    EXTRACTORS = {}
+
+    def __init__(
+        self, cache_dir=None, max_bytes=MAXBYTES, max_cache_bytes=MAXCACHEBYTES
+    ):
+        if cache_dir is None:
+            cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join(
+                os.path.expanduser("~"), ".cache"
+            )
+            cache_dir = os.path.join(cache_home, "FileClassifier", "text")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_cache_bytes = max_cache_bytes
+        self._pruned = False
+
+    @classmethod
+    def register(cls, extension, extractor):
+        """Uses `extractor(path) -> str` for the files with `extension`."""
+        cls.EXTRACTORS[extension] = extractor
+
+    def extract(self, path):
+        """
+        Returns the text of the document at `path`, at most `max_bytes` long.
+
+        Extraction errors are not raised: the document then has no text, its raw
+        bytes would only be noise to the models.
+        """
+        extractor = self.EXTRACTORS.get(split_extension(path))
+        if extractor is None:
+            return read_document(path, max_bytes=self.max_bytes)
+
+        cache_file = None
+        if self.cache_dir:
+            key = f"{hash_file(path)}:{_name(extractor)}:{self.max_bytes}"
+            digest = hashlib.blake2b(key.encode("utf-8"), digest_size=20).hexdigest()
+            cache_file = os.path.join(self.cache_dir, digest[:2], f"{digest}.txt")
+            if os.path.isfile(cache_file):
+                try:
+                    # the modification time tells the recently used entries
+                    os.utime(cache_file)
+                except OSError:
+                    pass
+                return read_document(cache_file, max_bytes=None)
+
+        try:
+            text = extractor(path)
+        except Exception:
+            return ""
+        if self.max_bytes is not None:
+            text = text[: self.max_bytes]
+
+        if cache_file is not None:
+            if not self._pruned:
+                self._pruned = True
+                self.prune()
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_file, cache_file)
+        return text
+
+    def prune(self):
+        """Removes the least recently used cached texts beyond `max_cache_bytes`."""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                cache_file = os.path.join(root, name)
+                try:
+                    st = os.stat(cache_file)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, cache_file))
+                total += st.st_size
+        entries.sort()
+        for _, size, cache_file in entries:
+            if total <= self.max_cache_bytes:
+                break
+            try:
+                os.remove(cache_file)
+            except OSError:
+                continue
+            total -= size
+
+
+def _name(extractor):
+    module = getattr(extractor, "__module__", "")
+    name = getattr(extractor, "__qualname__", type(extractor).__qualname__)
+    return f"{module}.{name}"
+
+
+def hash_file(path):
+    """Returns the blake2b hex digest of the content of `path`."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNKSIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_zip_xml(path):
+    """Extracts the text of an Office Open XML or OpenDocument file."""
+    members = _ZIP_MEMBERS[split_extension(path)]
+    parts = []
+    with zipfile.ZipFile(path) as archive:
+        for name in sorted(archive.namelist()):
+            if members.match(name):
+                with archive.open(name) as member:
+                    xml = member.read(ZIPMEMBERLIMIT).decode("utf-8", errors="ignore")
+                xml = _BREAK.sub("\n", xml)
+                parts.append(html.unescape(_TAG.sub(" ", xml)))
+    return "\n".join(parts)
+
+
+def extract_pdf(path):
+    """Extracts the text shown by the content streams of a PDF."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        PdfReader = None
+    if PdfReader is not None:
+        return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+    with open(path, "rb") as f:
+        data = f.read(READLIMIT)
+    lines = []
+    for match in _PDF_STREAM.finditer(data):
+        stream = match.group(1)
+        try:
+            stream = zlib.decompress(stream)
+        except zlib.error:
+            pass
+        for text in _PDF_TEXT.finditer(stream):
+            strings = _PDF_STRING.findall(text.group(1) or text.group(2))
+            line = b"".join(_unescape_pdf(string[1:-1]) for string in strings)
+            if line:
+                lines.append(line.decode("latin-1"))
+    return "\n".join(lines)
+
+
+def _unescape_pdf(string):
+    def replace(match):
+        escape = match.group(1)
+        if escape in _PDF_ESCAPES:
+            return _PDF_ESCAPES[escape]
+        if escape.isdigit():
+            return bytes([int(escape, 8) & 0xFF])
+        return escape
+
+    return _PDF_ESCAPE.sub(replace, string)
+
+
+def extract_rtf(path):
+    """Strips the control words and groups of an RTF file."""
+    text = read_document(path, max_bytes=READLIMIT, encoding="latin-1")
+    return _RTF_CONTROL.sub("", text)
+
+
+def extract_strings(path):
+    """Extracts the printable (ASCII or UTF-16) runs of a binary document."""
+    with open(path, "rb") as f:
+        data = f.read(READLIMIT)
+    runs = [run.decode("utf-16-le") for run in _PRINTABLE_UTF16.findall(data)]
+    if not runs:
+        runs = [run.decode("ascii") for run in _PRINTABLE.findall(data)]
+    return "\n".join(runs)
+
+
+for _extension in _ZIP_MEMBERS:
+    TextExtractor.register(_extension, extract_zip_xml)
+TextExtractor.register("pdf", extract_pdf)
+TextExtractor.register("rtf", extract_rtf)
+for _extension in ("doc", "xls", "ppt", "wpd"):
+    TextExtractor.register(_extension, extract_strings)
@@ -0,0 +1,160 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+from src.Scanner import scan
+from src.Scanner import split_extension
+
+# Extensions of files that are still being downloaded, see FileUtils.formats
+PARTIAL_EXTENSIONS = frozenset({"part", "crdownload"})
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT = struct.Struct("iIII")
+
+
+class Watcher:
+    """
+    Calls `callback` with the names of the files that appear in `directory`.
+
+    A file is reported once it has been closed (or moved in) and stayed untouched
+    for `debounce` seconds, so partially written files are not classified. Files
+    with a `PARTIAL_EXTENSIONS` extension are never reported: they are picked up
+    under their final name once the download renames them.
+
+    inotify is used on Linux and a `scandir` polling loop everywhere else. Both
+    only look at new events, the directory is never re-classified as a whole, except
+    after the inotify queue overflowed: events were then lost, so every file of the
+    directory is reported once.
+    """
+
+    def __init__(
+        self, directory, callback, debounce=0.5, poll_interval=1.0, inotify=True
+    ):
+        self.directory = directory
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.inotify = inotify
+        self._pending = {}
+
+    def run(self, stop=None):
+        """
+        Watches the directory until `stop` (a `threading.Event`) is set or Ctrl-C.
+        """
+        fd = _inotify_watch(self.directory) if self.inotify else None
+        try:
+            if fd is None:
+                self._poll(stop)
+            else:
+                self._inotify(fd, stop)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def _inotify(self, fd, stop):
+        while stop is None or not stop.is_set():
+            timeout = self._next_timeout()
+            readable, _, _ = select.select([fd], [], [], timeout)
+            if readable:
+                try:
+                    data = os.read(fd, 64 * 1024)
+                except BlockingIOError:
+                    data = b""
+                now = time.monotonic()
+                for mask, name in _parse_events(data):
+                    if mask & IN_Q_OVERFLOW:
+                        self._rescan(now)
+                        continue
+                    if mask & IN_ISDIR or not self._wanted(name):
+                        continue
+                    if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                        self._pending[name] = now + self.debounce
+                    elif name in self._pending:
+                        # still being written, push the deadline back
+                        self._pending[name] = now + self.debounce
+            self._flush()
+
+    def _poll(self, stop):
+        seen = None
+        while stop is None or not stop.is_set():
+            current = {}
+            now = time.monotonic()
+            for record in scan(self.directory, hidden=True):
+                if not self._wanted(record.name):
+                    continue
+                current[record.name] = state = (record.size, record.mtime)
+                # the first listing is only a baseline, like inotify starting up
+                if seen is not None and seen.get(record.name) != state:
+                    self._pending[record.name] = now + self.debounce
+            seen = current
+            self._flush(changed=seen)
+            time.sleep(min(self.poll_interval, self._next_timeout()))
+
+    def _rescan(self, now):
+        for record in scan(self.directory, hidden=True, stat=False):
+            if self._wanted(record.name):
+                self._pending[record.name] = now + self.debounce
+
+    def _next_timeout(self):
+        if not self._pending:
+            return self.poll_interval
+        return max(0.0, min(self._pending.values()) - time.monotonic())
+
+    def _flush(self, changed=None):
+        now = time.monotonic()
+        ready = [name for name, deadline in self._pending.items() if deadline <= now]
+        for name in ready:
+            del self._pending[name]
+        ready = [
+            name
+            for name in ready
+            if (changed is None or name in changed)
+            and os.path.isfile(os.path.join(self.directory, name))
+        ]
+        if ready:
+            self.callback(ready)
+
+    def _wanted(self, name):
+        return split_extension(name) not in PARTIAL_EXTENSIONS
+
+
+def _inotify_watch(directory):
+    """Returns an inotify file descriptor watching `directory`, or None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MODIFY | IN_CREATE
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _parse_events(data):
+    offset = 0
+    while offset + _EVENT.size <= len(data):
+        _, mask, _, length = _EVENT.unpack_from(data, offset)
+        offset += _EVENT.size
+        name = data[offset : offset + length].rstrip(b"\0")
+        offset += length
+        yield mask, os.fsdecode(name)
@@ -1,11 +1,19 @@
+import cProfile
+import os
+import pstats
 from typing import List
 from typing import Optional
 
 import typer
 
-from src import Classifier
+from src.Classifier import Classifier
+from src.Classifier import TOPICEXTENSIONS
+from src.RuleEngine import parse_size
 
 
+# Functions listed by --profile, by cumulative time
+PROFILELINES = 30
+
 app = typer.Typer()
 
 
@@ -13,7 +21,6 @@ app = typer.Typer()
     context_settings={"allow_extra_args": True, "ignore_unknown_options": True},
     help="Classify files in a directory",
 )
-@app.command()
 def main(
     version: bool = typer.Option(
         False, "--version", help="Show version, filename and exit"
@@ -43,16 +50,177 @@ def main(
     dateformat: Optional[str] = typer.Option(
         None, "--dateformat", help="Set the date format using YYYY, MM or DD"
     ),
+    size: Optional[str] = typer.Option(
+        None,
+        "--size",
+        help="Organize files by size, between these comma-separated bounds (e.g. 1MB,1GB)",
+    ),
+    size_range: Optional[str] = typer.Option(
+        None,
+        "--size-range",
+        help="Move the files whose size is within MIN,MAX (e.g. 10MB,100MB)",
+    ),
+    author: bool = typer.Option(
+        False, "--author", help="Organize files by the user owning them"
+    ),
+    most_recent: Optional[int] = typer.Option(
+        None, "--most-recent", min=1, help="Move the N most recently modified files"
+    ),
+    oldest: Optional[int] = typer.Option(
+        None, "--oldest", min=1, help="Move the N least recently modified files"
+    ),
+    analyze: bool = typer.Option(
+        False,
+        "--analyze",
+        help="Report counts, sizes and ages of the files per category, without moving them",
+    ),
+    report: Optional[str] = typer.Option(
+        None, "--report", help="Save the --analyze report to this .json or .csv file"
+    ),
     topicmodel: bool = typer.Option(
         False, "--topicmodel", help="Perform topic modeling on text files"
     ),
+    semantic_cluster: bool = typer.Option(
+        False,
+        "--semantic-cluster",
+        help="Group text files into folders by the similarity of their content",
+    ),
+    clusters: int = typer.Option(
+        8, "--clusters", min=1, help="Number of clusters for --semantic-cluster"
+    ),
+    embedding_model: Optional[str] = typer.Option(
+        None,
+        "--embedding-model",
+        help="Local transformer model directory used to embed documents with --semantic-cluster",
+    ),
     extensions: Optional[str] = typer.Option(
         None,
         "--extensions",
         help="File extensions to consider for topic modeling (comma-separated)",
     ),
+    workers: int = typer.Option(
+        1, "--workers", min=1, help="Number of files moved in parallel"
+    ),
+    recursive: bool = typer.Option(
+        False, "--recursive", help="Also classify the files of sub-directories"
+    ),
+    max_depth: Optional[int] = typer.Option(
+        None,
+        "--max-depth",
+        min=0,
+        help="How many levels of sub-directories to descend into with --recursive",
+    ),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental",
+        help="Remember examined files in .classifier.db and skip them while unchanged",
+    ),
+    full_rescan: bool = typer.Option(
+        False, "--full-rescan", help="Ignore the incremental index and rebuild it"
+    ),
+    watch: bool = typer.Option(
+        False,
+        "--watch",
+        help="Keep running and classify new files as soon as they are written",
+    ),
+    content_detection: str = typer.Option(
+        "unknown",
+        "--content-detection",
+        help="Identify files from their first bytes: off, unknown (extension) or all",
+    ),
+    model: Optional[str] = typer.Option(
+        None,
+        "--model",
+        help="Saved model predicting the category of files no extension rule matches",
+    ),
+    train_model: bool = typer.Option(
+        False,
+        "--train-model",
+        help="Train the --model on the files of the directory whose type is known",
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Show the planned moves without moving anything"
+    ),
+    plan: Optional[str] = typer.Option(
+        None, "--plan", help="Save the --dry-run plan to this .json or .csv file"
+    ),
+    execute_plan: Optional[str] = typer.Option(
+        None, "--execute-plan", help="Run the moves of a plan saved with --plan"
+    ),
+    journal: Optional[str] = typer.Option(
+        None,
+        "--journal",
+        help="Append every completed move to this journal file, outside the classified folder",
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="Continue an interrupted run, skipping the moves listed in --journal",
+    ),
+    undo: Optional[str] = typer.Option(
+        None, "--undo", help="Move the files listed in a journal back, newest first"
+    ),
+    duplicates: Optional[str] = typer.Option(
+        None,
+        "--duplicates",
+        help="Handle byte-identical files: move (to duplicates/), link (hard link) or skip",
+    ),
+    stats: bool = typer.Option(
+        False, "--stats", help="Print the time spent in every stage and the counters"
+    ),
+    stats_output: Optional[str] = typer.Option(
+        None,
+        "--stats-output",
+        help="Save the --stats to this .json or Prometheus text (.prom) file",
+    ),
+    profile: Optional[str] = typer.Option(
+        None,
+        "--profile",
+        help="Run under cProfile, save the profile to this file and print the top functions",
+    ),
 ):
-    classifier = Classifier()
+    try:
+        size = [parse_size(bound) for bound in size.split(",")] if size else None
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--size")
+    try:
+        size_range = (
+            [parse_size(bound) for bound in size_range.split(",")]
+            if size_range
+            else None
+        )
+    except ValueError as e:
+        raise typer.BadParameter(str(e), param_hint="--size-range")
+    if size_range is not None and len(size_range) != 2:
+        raise typer.BadParameter("must be MIN,MAX", param_hint="--size-range")
+    if duplicates not in (None, "move", "link", "skip"):
+        raise typer.BadParameter(
+            "must be move, link or skip", param_hint="--duplicates"
+        )
+    if resume and not journal:
+        raise typer.BadParameter("requires --journal", param_hint="--resume")
+    if train_model and not model:
+        raise typer.BadParameter("requires --model", param_hint="--train-model")
+    if content_detection not in ("off", "unknown", "all"):
+        raise typer.BadParameter(
+            "must be off, unknown or all", param_hint="--content-detection"
+        )
+    if not recursive:
+        max_depth = 0
+    classifier = Classifier(
+        directory or os.getcwd(),
+        workers=workers,
+        max_depth=max_depth,
+        incremental=incremental or full_rescan,
+        full_rescan=full_rescan,
+        content_detection=content_detection,
+        model_path=model,
+        dry_run=dry_run or plan is not None,
+        journal_path=journal,
+        resume=resume,
+        duplicates=duplicates,
+        stats=stats or stats_output is not None,
+    )
     classifier.args = {
         "version": version,
         "types": types,
@@ -64,23 +232,64 @@ def main(
         "directory": directory,
         "date": date,
         "dateformat": dateformat,
+        "size": size,
+        "size_range": size_range,
+        "author": author,
+        "most_recent": most_recent,
+        "oldest": oldest,
+        "analyze": analyze,
+        "report": report,
         "topicmodel": topicmodel,
+        "semantic_cluster": semantic_cluster,
+        "clusters": clusters,
+        "embedding_model": embedding_model,
         "extensions": extensions,
+        "workers": workers,
+        "recursive": recursive,
+        "max_depth": max_depth,
+        "incremental": incremental,
+        "full_rescan": full_rescan,
+        "watch": watch,
+        "content_detection": content_detection,
+        "model": model,
+        "train_model": train_model,
+        "dry_run": dry_run,
+        "plan": plan,
+        "execute_plan": execute_plan,
+        "journal": journal,
+        "resume": resume,
+        "undo": undo,
+        "duplicates": duplicates,
+        "stats": stats,
+        "stats_output": stats_output,
+        "profile": profile,
     }
 
-    if classifier.args["topicmodel"]:
+    if not (version or types or edittypes or reset):
+        try:
+            classifier.get_routing_index()
+        except ValueError as e:
+            raise typer.BadParameter(str(e), param_hint="config file")
+
+    if classifier.args["topicmodel"] or classifier.args["semantic_cluster"]:
         if classifier.args["extensions"]:
             extensions = classifier.args["extensions"].split(",")
         else:
-            extensions = [
-                "txt",
-                "pdf",
-                "doc",
-                "docx",
-            ]  # Default extensions for topic modeling
+            extensions = TOPICEXTENSIONS  # Default extensions for topic modeling
 
-        classifier.topic_modeling(classifier.args["directory"], extensions)
-    classifier.run()
+        classifier.args["extensions"] = extensions
+    profiler = cProfile.Profile() if profile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        classifier.run()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILELINES)
+        if classifier.stats.enabled:
+            classifier.report_stats(stats_output)
 
 
 if __name__ == "__main__":
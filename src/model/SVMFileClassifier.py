@@ -1,13 +1,23 @@
 import os
+import pickle
 import re
 
+import numpy as np
 import pandas as pd
 from sklearn import svm
-from sklearn.base import accuracy_score
-from sklearn.calibration import LabelEncoder
 from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score
 from sklearn.metrics import classification_report
 from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+from src.DocumentLoader import iter_documents
+from src.DocumentLoader import MAXBYTES
+from src.TextExtractor import TextExtractor
+
+_NAME_TOKEN = re.compile(r"[a-z]+|\d+")
 
 
 class SVMFileClassifier:
@@ -28,21 +38,17 @@ class SVMFileClassifier:
     def preprocess(self, text):
         return self.extract_course(text)
 
-    def load_files(self, directory, extensions):
-        files = []
-        for file in os.listdir(directory):
-            filename, file_ext = os.path.splitext(file)
-            file_ext = file_ext.lower().replace(".", "")
-
-            if file_ext in extensions and os.path.isfile(os.path.join(directory, file)):
-                with open(
-                    os.path.join(directory, file),
-                    encoding="utf-8",
-                    errors="ignore",
-                ) as f:
-                    text = f.read()
-                    files.append({"text": text, "extension": file_ext})
-        return pd.DataFrame(files)
+    def load_files(self, directory, extensions, max_bytes=MAXBYTES):
+        files = (
+            {"text": text, "extension": record.ext}
+            for record, text in iter_documents(
+                directory,
+                extensions,
+                with_records=True,
+                reader=TextExtractor(max_bytes=max_bytes).extract,
+            )
+        )
+        return pd.DataFrame(files, columns=["text", "extension"])
 
     def fit(self, X, y):
         self.vectorizer.fit(X)
@@ -68,6 +74,96 @@ class SVMFileClassifier:
         print(f"Classification report:\n{report}")
 
 
+class SGDFileClassifier(SVMFileClassifier):
+    """
+    Linear SVM trained by stochastic gradient descent on hashed features.
+
+    `HashingVectorizer` keeps no vocabulary, and training cost grows linearly with
+    the number of samples. `partial_fit` updates a trained model with new samples
+    (e.g. user corrections), and the model is persisted with `save` and `load`.
+    The set of labels is fixed by `classes`, or by the first training batch.
+
+    Samples are texts, or rows of feature values which are joined into one text.
+    """
+
+    def __init__(self, features=None, classes=None, alpha=1e-4, n_features=1 << 20):
+        if features is None:
+            features = ["extension"]
+        self.features = features
+        self.classes = sorted(classes) if classes is not None else None
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, alternate_sign=False, token_pattern=r"(?u)\b\w+\b"
+        )
+        self.classifier = SGDClassifier(loss="hinge", alpha=alpha, random_state=42)
+
+    def transform(self, X):
+        return self.vectorizer.transform(
+            x if isinstance(x, str) else " ".join(map(str, x)) for x in X
+        )
+
+    def fit(self, X, y, epochs=5):
+        """Trains a new model, making `epochs` shuffled passes over the samples."""
+        self.classifier = SGDClassifier(
+            loss="hinge", alpha=self.classifier.alpha, random_state=42
+        )
+        X_vec = self.transform(X)
+        y = np.asarray(y)
+        self.classes = sorted(set(self.classes or ()) | set(y))
+        rng = np.random.default_rng(42)
+        for _ in range(epochs):
+            order = rng.permutation(len(y))
+            self._update(X_vec[order], y[order])
+
+    def partial_fit(self, X, y):
+        """Updates the model with the samples `X` labelled `y`."""
+        self._update(self.transform(X), y)
+
+    def _update(self, X_vec, y):
+        if self.classes is None:
+            self.classes = sorted(set(y))
+        unknown = set(y) - set(self.classes)
+        if unknown:
+            raise ValueError(f"Unknown labels: {', '.join(map(str, sorted(unknown)))}")
+        self.classifier.partial_fit(X_vec, y, classes=self.classes)
+
+    def predict(self, X):
+        return self.classifier.predict(self.transform(X))
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def file_features(record, header_size=16):
+    """
+    Returns the cheap features of a `FileRecord` as one text for `SGDFileClassifier`.
+
+    These are the tokens of the file name, its extension, the order of magnitude of
+    its size and its first `header_size` bytes, each byte tagged with its position.
+    """
+    stem = record.name[: -len(record.ext) - 1] if record.ext else record.name
+    features = [f"name_{token}" for token in _NAME_TOKEN.findall(stem.lower())]
+    features.append(f"ext_{(record.ext or 'none').replace('.', '_')}")
+    try:
+        size = record.size
+        if size is None:
+            size = os.stat(record.path).st_size
+        with open(record.path, "rb") as f:
+            header = f.read(header_size)
+    except OSError:
+        return " ".join(features)
+    features.append(f"size_{size.bit_length()}")
+    features.extend(f"byte{idx}_{byte:02x}" for idx, byte in enumerate(header))
+    return " ".join(features)
+
+
 def run_topic_modeling():
     # Create an instance of the SVMFileClassifier class
     classifier = SVMFileClassifier(
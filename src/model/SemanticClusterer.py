@@ -0,0 +1,317 @@
+import os
+import pickle
+import re
+
+import numpy as np
+
+VECTORSFILE = "vectors.npy"
+KEYSFILE = "keys.txt"
+EMBEDDERFILE = "embedder.pkl"
+# Documents an embedder must be fitted on before it is kept for good
+MINFITSIZE = 256
+
+
+class EmbeddingCache:
+    """
+    Document embeddings keyed by content hash, in a memory-mapped `.npy` file.
+
+    Row `i` of `vectors.npy` holds the embedding of the i-th hash of `keys.txt`.
+    Vectors are flushed before their keys are appended, so an interrupted run never
+    leaves a key without its vector. The array grows by doubling its capacity.
+    """
+
+    def __init__(self, directory, dimensions, capacity=1024):
+        self.directory = directory
+        self.dimensions = dimensions
+        self.vectors_file = os.path.join(directory, VECTORSFILE)
+        self.keys_file = os.path.join(directory, KEYSFILE)
+        os.makedirs(directory, exist_ok=True)
+
+        self.vectors = None
+        if os.path.isfile(self.vectors_file):
+            self.vectors = np.load(self.vectors_file, mmap_mode="r+")
+            if self.vectors.ndim != 2 or self.vectors.shape[1] != dimensions:
+                self.vectors = None
+        if self.vectors is None:
+            self.vectors = np.lib.format.open_memmap(
+                self.vectors_file,
+                mode="w+",
+                dtype=np.float32,
+                shape=(capacity, dimensions),
+            )
+            with open(self.keys_file, "w"):
+                pass
+
+        self.rows = {}
+        self.size = 0
+        if os.path.isfile(self.keys_file):
+            with open(self.keys_file) as f:
+                keys = f.read().split()[: len(self.vectors)]
+            for row, key in enumerate(keys):
+                self.rows.setdefault(key, row)
+            self.size = len(keys)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, keys, vectors):
+        """Stores `vectors` (one row per key) under `keys`."""
+        start = self.size
+        end = start + len(keys)
+        if end > len(self.vectors):
+            self._grow(end)
+        self.vectors[start:end] = vectors
+        self.vectors.flush()
+        with open(self.keys_file, "a") as f:
+            f.write("".join(f"{key}\n" for key in keys))
+        for row, key in enumerate(keys, start):
+            self.rows.setdefault(key, row)
+        self.size = end
+
+    def _grow(self, size):
+        capacity = max(size, 2 * len(self.vectors))
+        tmp_file = f"{self.vectors_file}.tmp"
+        vectors = np.lib.format.open_memmap(
+            tmp_file, mode="w+", dtype=np.float32, shape=(capacity, self.dimensions)
+        )
+        vectors[: self.size] = self.vectors[: self.size]
+        vectors.flush()
+        del self.vectors
+        os.replace(tmp_file, self.vectors_file)
+        self.vectors = np.load(self.vectors_file, mmap_mode="r+")
+
+
+class TfidfSvdEmbedder:
+    """
+    Embeds documents with TF-IDF weights reduced by a truncated SVD (LSA).
+
+    Terms are hashed, so no vocabulary is held in memory. Runs on the CPU and needs
+    no download; it is fitted on a sample of the corpus and then reused.
+    """
+
+    name = "tfidf-svd"
+    refittable = True
+
+    def __init__(self, dimensions=128, n_features=1 << 18):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.max_dimensions = dimensions
+        self.dimensions = dimensions
+        self.samples = 0
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, stop_words="english", alternate_sign=False
+        )
+        self.tfidf = None
+        self.svd = None
+
+    def fit(self, documents):
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.feature_extraction.text import TfidfTransformer
+
+        counts = self.vectorizer.transform(documents)
+        self.tfidf = TfidfTransformer().fit(counts)
+        self.samples = counts.shape[0]
+        # LSA cannot have more components than documents
+        self.dimensions = max(1, min(self.max_dimensions, self.samples - 1))
+        self.svd = TruncatedSVD(self.dimensions, random_state=0)
+        self.svd.fit(self.tfidf.transform(counts))
+        return self
+
+    def transform(self, documents):
+        vectors = self.svd.transform(
+            self.tfidf.transform(self.vectorizer.transform(documents))
+        )
+        return _normalize(vectors)
+
+
+class TransformerEmbedder:
+    """
+    Embeds documents with the mean-pooled hidden states of a local transformer model.
+    """
+
+    refittable = False
+
+    def __init__(self, model_name, batch_size=32, device=-1):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self.name = re.sub(r"\W+", "-", os.path.basename(os.path.normpath(model_name)))
+        self._pipeline = None
+
+    @property
+    def pipeline(self):
+        if self._pipeline is None:
+            from transformers import pipeline
+
+            self._pipeline = pipeline(
+                "feature-extraction", model=self.model_name, device=self.device
+            )
+        return self._pipeline
+
+    @property
+    def dimensions(self):
+        return self.pipeline.model.config.hidden_size
+
+    def fit(self, documents):
+        return self
+
+    def transform(self, documents):
+        outputs = self.pipeline(
+            list(documents), batch_size=self.batch_size, truncation=True
+        )
+        vectors = [
+            np.asarray(output, dtype=np.float32)[0].mean(axis=0) for output in outputs
+        ]
+        return _normalize(np.vstack(vectors))
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_pipeline"] = None
+        return state
+
+
+class SemanticClusterer:
+    """
+    Clusters documents by meaning with mini-batch k-means over cached embeddings.
+
+    Embeddings come from a `TfidfSvdEmbedder`, or from a `TransformerEmbedder` when
+    `model_name` points to a local model. They are cached in `cache_dir` by content
+    hash (one sub-directory per embedder), so a re-run only embeds new files. Both
+    embedding and clustering stream over `batch_size` documents at a time, the
+    whole corpus is only ever held as the memory-mapped array.
+
+    An embedder fitted on fewer than `min_fit_size` documents (e.g. on the two files
+    of a first run) is fitted again, and the cache rebuilt, once the corpus has
+    grown past the number of documents it saw.
+
+    The embedder is pickled in `cache_dir`, which must only be writable by the user.
+    """
+
+    def __init__(
+        self,
+        cache_dir,
+        num_clusters=8,
+        dimensions=128,
+        model_name=None,
+        batch_size=1024,
+        fit_size=10000,
+        passes=3,
+        min_fit_size=MINFITSIZE,
+    ):
+        self.num_clusters = num_clusters
+        self.batch_size = batch_size
+        self.fit_size = fit_size
+        self.min_fit_size = min_fit_size
+        self.passes = passes
+        if model_name is None:
+            self.embedder = TfidfSvdEmbedder(dimensions)
+        else:
+            self.embedder = TransformerEmbedder(model_name)
+        self.directory = os.path.join(cache_dir, self.embedder.name)
+        self.embedder_file = os.path.join(self.directory, EMBEDDERFILE)
+        self.cache = None
+        if os.path.isfile(self.embedder_file):
+            with open(self.embedder_file, "rb") as f:
+                self.embedder = pickle.load(f)
+            self.cache = EmbeddingCache(self.directory, self.embedder.dimensions)
+
+    def missing(self, keys):
+        """
+        Returns the set of `keys` whose document has not been embedded yet, all of
+        them when the embedder must be fitted again on this larger corpus.
+        """
+        keys = set(keys)
+        if self.cache is not None and self._undertrained(len(keys)):
+            self.cache = None
+        if self.cache is None:
+            return keys
+        return {key for key in keys if key not in self.cache}
+
+    def _undertrained(self, documents):
+        embedder = self.embedder
+        return (
+            embedder.refittable
+            and embedder.samples < min(self.min_fit_size, self.fit_size)
+            and documents > embedder.samples
+        )
+
+    def embed(self, keys, documents):
+        """
+        Embeds and caches `documents`, the texts of the content hashes `keys`.
+
+        An embedder that was never fitted is first fitted on the `fit_size` first
+        documents, and saved next to the embeddings it produces.
+        """
+        documents = iter(documents)
+        keys = list(keys)
+        offset = 0
+        if self.cache is None:
+            sample = [next(documents) for _ in keys[: self.fit_size]]
+            if not sample:
+                return
+            self.embedder.fit(sample)
+            os.makedirs(self.directory, exist_ok=True)
+            # vectors of a previous embedder are meaningless for this one
+            for name in (VECTORSFILE, KEYSFILE):
+                if os.path.isfile(os.path.join(self.directory, name)):
+                    os.remove(os.path.join(self.directory, name))
+            with open(self.embedder_file, "wb") as f:
+                pickle.dump(self.embedder, f)
+            self.cache = EmbeddingCache(self.directory, self.embedder.dimensions)
+            for start in range(0, len(sample), self.batch_size):
+                batch = sample[start : start + self.batch_size]
+                self.cache.add(
+                    keys[start : start + len(batch)], self.embedder.transform(batch)
+                )
+            offset = len(sample)
+
+        while offset < len(keys):
+            batch_keys = keys[offset : offset + self.batch_size]
+            batch = [next(documents) for _ in batch_keys]
+            self.cache.add(batch_keys, self.embedder.transform(batch))
+            offset += len(batch_keys)
+
+    def cluster(self, keys):
+        """
+        Returns the cluster of each of `keys`, which must all have been embedded.
+
+        Runs `passes` rounds of `MiniBatchKMeans.partial_fit` over shuffled batches,
+        then assigns every document batch by batch.
+        """
+        from sklearn.cluster import MiniBatchKMeans
+
+        rows = np.fromiter(
+            (self.cache.rows[key] for key in keys), dtype=np.int64, count=len(keys)
+        )
+        unique = np.unique(rows)
+        num_clusters = min(self.num_clusters, len(unique))
+        if num_clusters <= 1:
+            return np.zeros(len(rows), dtype=np.int64)
+
+        kmeans = MiniBatchKMeans(num_clusters, random_state=0, n_init=3)
+        batch_size = max(self.batch_size, num_clusters)
+        rng = np.random.default_rng(0)
+        for _ in range(self.passes):
+            shuffled = rng.permutation(unique)
+            for start in range(0, len(shuffled), batch_size):
+                # sorted rows read the memory-mapped file sequentially
+                batch = np.sort(shuffled[start : start + batch_size])
+                kmeans.partial_fit(self.cache.vectors[batch])
+
+        labels = np.empty(len(rows), dtype=np.int64)
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start : start + batch_size]
+            labels[start : start + len(batch)] = kmeans.predict(
+                self.cache.vectors[batch]
+            )
+        return labels
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
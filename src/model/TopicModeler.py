@@ -1,62 +1,248 @@
+import functools
 import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
-import nltk
-from gensim import corpora
-from gensim import models
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from nltk.tokenize import word_tokenize
+from src.DocumentLoader import iter_documents
+from src.DocumentLoader import MAXBYTES
+from src.TextExtractor import TextExtractor
+
+MODELFILE = "lda.model"
+DICTIONARYFILE = "lda.dictionary"
+LEMMACACHESIZE = 1 << 18
 
 
 class TopicModeler:
-    def __init__(self, num_topics=5):
-        nltk.download("stopwords")
-        nltk.download("punkt")
-        nltk.download("wordnet")
+    """
+    LDA topic modeling over text documents.
+
+    nltk and gensim are only imported the first time they are needed, and the nltk
+    resources are looked up in `data_dir` (then in the usual `NLTK_DATA` locations)
+    without ever downloading them. A missing resource falls back to a plain-Python
+    equivalent: a regex tokenizer, scikit-learn's English stop words, or no
+    lemmatization.
+    """
+
+    def __init__(self, num_topics=5, data_dir=None):
         self.num_topics = num_topics
-        self.lemmatizer = WordNetLemmatizer()
-        self.stop_words = set(stopwords.words("english"))
+        self.data_dir = data_dir
+        self.lda = None
+        self.dictionary = None
+        self._tokenize = None
+        self._lemmatize = None
+        self._stop_words = None
+
+    def load_resources(self):
+        """Resolves the nltk tokenizer, lemmatizer and stop words from local data."""
+        if self._tokenize is not None:
+            return
+        try:
+            import nltk
+        except ImportError:
+            nltk = None
+        if nltk is not None and self.data_dir and self.data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, self.data_dir)
+
+        self._tokenize = re.compile(r"\w+").findall
+        self._lemmatize = str
+        self._stop_words = None
+        if nltk is not None:
+            # each resource raises LookupError when it is not installed locally
+            try:
+                from nltk.tokenize import word_tokenize
+
+                word_tokenize("probe")
+                self._tokenize = word_tokenize
+            except LookupError:
+                pass
+            try:
+                from nltk.stem import WordNetLemmatizer
+
+                lemmatize = WordNetLemmatizer().lemmatize
+                lemmatize("probes")
+                # most tokens repeat, so lemmas are memoized (per process)
+                self._lemmatize = functools.lru_cache(maxsize=LEMMACACHESIZE)(lemmatize)
+            except LookupError:
+                pass
+            try:
+                from nltk.corpus import stopwords
+
+                self._stop_words = set(stopwords.words("english"))
+            except LookupError:
+                pass
+        if self._stop_words is None:
+            from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+            self._stop_words = set(ENGLISH_STOP_WORDS)
+
+    @property
+    def stop_words(self):
+        self.load_resources()
+        return self._stop_words
 
     def preprocess(self, text):
-        tokens = word_tokenize(text.lower())
+        self.load_resources()
+        tokens = self._tokenize(text.lower())
         tokens = [
-            self.lemmatizer.lemmatize(token)
+            self._lemmatize(token)
             for token in tokens
-            if token.isalnum() and token not in self.stop_words
+            if token.isalnum() and token not in self._stop_words
         ]
         return tokens
 
+    def preprocess_many(self, documents, processes=None, chunksize=64):
+        """
+        Preprocesses `documents` on a pool of processes, keeping their order.
+
+        Args:
+            documents (iterable): The raw texts, consumed lazily.
+            processes (int): Number of worker processes, one or None runs inline.
+            chunksize (int): Number of documents sent to a worker at a time.
+
+        Returns:
+            list: The token list of every document, ready for `corpora.Dictionary`.
+        """
+        if not processes or processes <= 1:
+            return [self.preprocess(document) for document in documents]
+        documents = iter(documents)
+        chunks = iter(lambda: list(islice(documents, chunksize)), [])
+        texts = []
+        pending = deque()
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_worker,
+            initargs=(self.data_dir,),
+        ) as pool:
+            # only a few chunks are in flight, so raw documents can be streamed in
+            for chunk in chunks:
+                pending.append(pool.submit(_preprocess_chunk, chunk))
+                if len(pending) >= processes * 2:
+                    texts.extend(pending.popleft().result())
+            while pending:
+                texts.extend(pending.popleft().result())
+        return texts
+
     def fit_transform(self, documents):
-        texts = [self.preprocess(document) for document in documents]
-        dictionary = corpora.Dictionary(texts)
-        corpus = [dictionary.doc2bow(text) for text in texts]
+        return self.fit(documents)
 
-        return models.LdaModel(
-            corpus, num_topics=self.num_topics, id2word=dictionary, passes=15
-        )
+    def fit(self, documents, workers=None, passes=15, tokenized=False):
+        """
+        Trains a single LDA model over the whole corpus.
+
+        Args:
+            documents (iterable): The raw texts.
+            workers (int): Number of preprocessing and training processes. More than
+                one uses gensim's `LdaMulticore`.
+            passes (int): Number of passes over the corpus.
+            tokenized (bool): Whether `documents` were already run through `preprocess`.
+
+        Returns:
+            LdaModel: The trained model, also kept on `self.lda`.
+        """
+        from gensim import corpora
+        from gensim import models
+
+        texts = documents if tokenized else self.preprocess_many(documents, workers)
+        self.dictionary = corpora.Dictionary(texts)
+        corpus = [self.dictionary.doc2bow(text) for text in texts]
 
-    def load_documents(self, directory, extensions):
-        documents = []
-        for file in os.listdir(directory):
-            filename, file_ext = os.path.splitext(file)
-            file_ext = file_ext.lower().replace(".", "")
-
-            if file_ext in extensions and os.path.isfile(os.path.join(directory, file)):
-                with open(
-                    os.path.join(directory, file),
-                    encoding="utf-8",
-                    errors="ignore",
-                ) as f:
-                    documents.append(f.read())
-        return documents
+        if workers and workers > 1:
+            self.lda = models.LdaMulticore(
+                corpus,
+                num_topics=self.num_topics,
+                id2word=self.dictionary,
+                passes=passes,
+                workers=workers,
+            )
+        else:
+            self.lda = models.LdaModel(
+                corpus,
+                num_topics=self.num_topics,
+                id2word=self.dictionary,
+                passes=passes,
+            )
+        return self.lda
+
+    def infer(self, documents, batch_size=256, tokenized=False):
+        """
+        Yields the dominant topic id of every document, inferring a batch at a time.
+
+        Args:
+            documents (iterable): The raw texts.
+            batch_size (int): Number of documents per inference call.
+            tokenized (bool): Whether `documents` were already run through `preprocess`.
+        """
+        batch = []
+        for document in documents:
+            tokens = document if tokenized else self.preprocess(document)
+            batch.append(self.dictionary.doc2bow(tokens))
+            if len(batch) >= batch_size:
+                yield from self._infer_batch(batch)
+                batch = []
+        if batch:
+            yield from self._infer_batch(batch)
+
+    def _infer_batch(self, bows):
+        gamma, _ = self.lda.inference(bows)
+        return gamma.argmax(axis=1).tolist()
+
+    def topic_label(self, topic_id, num_words=3):
+        """Returns a folder name made of the topic id and its top words."""
+        words = [term for term, _ in self.lda.show_topic(topic_id, topn=num_words)]
+        return "-".join([f"topic{topic_id}"] + words)
+
+    def save(self, directory):
+        """Persists the trained model and its dictionary in `directory`."""
+        os.makedirs(directory, exist_ok=True)
+        self.lda.save(os.path.join(directory, MODELFILE))
+        self.dictionary.save(os.path.join(directory, DICTIONARYFILE))
+
+    def load(self, directory):
+        """
+        Loads a model saved by `save`.
+
+        Returns:
+            bool: False if `directory` does not contain a saved model.
+        """
+        model_file = os.path.join(directory, MODELFILE)
+        dictionary_file = os.path.join(directory, DICTIONARYFILE)
+        if not (os.path.isfile(model_file) and os.path.isfile(dictionary_file)):
+            return False
+        from gensim import corpora
+        from gensim import models
+
+        self.lda = models.LdaModel.load(model_file)
+        self.dictionary = corpora.Dictionary.load(dictionary_file)
+        self.num_topics = self.lda.num_topics
+        return True
+
+    def load_documents(self, directory, extensions, max_bytes=MAXBYTES):
+        return iter_documents(
+            directory, extensions, reader=TextExtractor(max_bytes=max_bytes).extract
+        )
 
     def topic_modeling(self, directory, extensions, num_topics=5):
         documents = self.load_documents(directory, extensions)
-        topic_modeler = TopicModeler(num_topics)
-        lda = topic_modeler.fit_transform(documents)
+        self.num_topics = num_topics
+        lda = self.fit(documents)
 
         topics = []
         for i in range(lda.num_topics):
             topic = ", ".join([term for term, freq in lda.show_topic(i)])
             topics.append(topic)
         return topics
+
+
+_worker = None
+
+
+def _init_worker(data_dir):
+    global _worker
+    _worker = TopicModeler(data_dir=data_dir)
+    _worker.load_resources()
+
+
+def _preprocess_chunk(documents):
+    return [_worker.preprocess(document) for document in documents]
@@ -1,48 +1,97 @@
-import os
+import re
+import time
 
-from nltk.tokenize import word_tokenize
-from transformers import pipeline
+from src.DocumentLoader import iter_documents
+from src.DocumentLoader import MAXBYTES
+from src.TextExtractor import TextExtractor
+
+# Pipelines are loaded once per (model, device) and shared by every modeler
+_PIPELINES = {}
 
 
 class TransformersTopicModeler:
-    def __init__(self, model_name, num_topics=5):
+    """
+    Generates a topic for each document with a Hugging Face text2text model.
+
+    The pipeline is loaded lazily, once, from `model_name` (a local model directory
+    needs no network) and shared across instances. Documents are generated in
+    batches of `batch_size`, grouped by length so a batch pads as little as
+    possible, and truncated to the model's maximum input length.
+    """
+
+    def __init__(
+        self, model_name, num_topics=5, batch_size=16, max_length=None, device=-1
+    ):
+        self.model_name = model_name
         self.num_topics = num_topics
-        self.model = pipeline("text2text-generation", model=model_name)
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.device = device
+        self.stats = {}
+
+    @property
+    def model(self):
+        key = (self.model_name, self.device)
+        if key not in _PIPELINES:
+            from transformers import pipeline
+
+            _PIPELINES[key] = pipeline(
+                "text2text-generation", model=self.model_name, device=self.device
+            )
+        return _PIPELINES[key]
+
+    @property
+    def input_length(self):
+        """The maximum number of input tokens of the model."""
+        if self.max_length is not None:
+            return self.max_length
+        model_max = getattr(self.model.tokenizer, "model_max_length", 512)
+        # tokenizers without a limit report a huge sentinel value
+        return model_max if model_max < 100_000 else 512
 
     def preprocess(self, text):
-        tokens = word_tokenize(text.lower())
-        tokens = [
-            self.lemmatizer.lemmatize(token)
-            for token in tokens
-            if token.isalnum() and token not in self.stop_words
-        ]
-        return tokens
-
-    def load_documents(self, directory, extensions):
-        documents = []
-        for file in os.listdir(directory):
-            filename, file_ext = os.path.splitext(file)
-            file_ext = file_ext.lower().replace(".", "")
-
-            if file_ext in extensions and os.path.isfile(os.path.join(directory, file)):
-                with open(
-                    os.path.join(directory, file),
-                    encoding="utf-8",
-                    errors="ignore",
-                ) as f:
-                    documents.append(f.read())
-        return documents
+        # a token is rarely longer than 8 characters, no need to tokenize the rest
+        text = text[: self.input_length * 8]
+        return re.sub(r"\s+", " ", text).strip()
 
-    def topic_modeling(self, directory, extensions, num_topics=5):
-        documents = self.load_documents(directory, extensions)
-        TransformersTopicModeler(num_topics)
-        topics = []
+    def load_documents(self, directory, extensions, max_bytes=MAXBYTES):
+        return iter_documents(
+            directory, extensions, reader=TextExtractor(max_bytes=max_bytes).extract
+        )
 
-        for document in documents:
-            text = self.preprocess(document)
-            generated_text = self.model(text, max_length=50, num_return_sequences=1)[0][
-                "generated_text"
-            ]
-            topics.append(generated_text)
+    def generate(self, documents):
+        """
+        Generates the topic of every document, in input order.
 
+        Returns:
+            list: The generated text of each document.
+        """
+        texts = [self.preprocess(document) for document in documents]
+        # length bucketing: neighbours in a batch have similar lengths
+        order = sorted(range(len(texts)), key=lambda idx: len(texts[idx]))
+        topics = [None] * len(texts)
+        start = time.perf_counter()
+        for offset in range(0, len(order), self.batch_size):
+            batch = order[offset : offset + self.batch_size]
+            outputs = self.model(
+                [texts[idx] for idx in batch],
+                batch_size=len(batch),
+                max_length=50,
+                num_return_sequences=1,
+                truncation=True,
+            )
+            for idx, output in zip(batch, outputs):
+                if isinstance(output, list):
+                    output = output[0]
+                topics[idx] = output["generated_text"]
+        elapsed = time.perf_counter() - start
+        self.stats = {
+            "documents": len(texts),
+            "seconds": elapsed,
+            "documents_per_second": len(texts) / elapsed if elapsed else 0.0,
+        }
         return topics
+
+    def topic_modeling(self, directory, extensions, num_topics=5):
+        self.num_topics = num_topics
+        return self.generate(self.load_documents(directory, extensions))
@@ -0,0 +1,50 @@
+import json
+
+from src.Analyzer import analyze
+from src.Analyzer import save_report
+from src.Analyzer import scan_table
+from src.FileUtils import FileUtils
+from src.RoutingIndex import RoutingIndex
+from src.Scanner import scan
+
+
+def test_report(tmp_path):
+    (tmp_path / "a.txt").write_bytes(b"x" * 100)
+    (tmp_path / "b.txt").write_bytes(b"x" * 300)
+    (tmp_path / "c.mp3").write_bytes(b"x" * 600)
+    (tmp_path / "d.xyz").write_bytes(b"")
+
+    index = RoutingIndex.from_formats(FileUtils.formats)
+    table = scan_table(scan(str(tmp_path)), index)
+    report = analyze(table)
+
+    assert report["files"] == 4 and report["bytes"] == 1000
+    assert report["largest"] == 600
+    assert report["extensions"]["txt"] == {
+        "files": 2,
+        "bytes": 400,
+        "percent": 50.0,
+        "percent_bytes": 40.0,
+    }
+    assert list(report["categories"]) == ["audio", "document", "unknown"]
+    assert report["age"]["<1d"]["files"] == 4
+
+    save_report(report, str(tmp_path / "report.json"))
+    with open(tmp_path / "report.json") as f:
+        assert json.load(f) == report
+    save_report(report, str(tmp_path / "report.csv"))
+    assert "extensions,mp3,1,600" in (tmp_path / "report.csv").read_text()
+
+
+def test_percentage_helpers(tmp_path):
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "target").mkdir()
+    (tmp_path / "photos").mkdir()
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "b.txt").write_text("b")
+
+    utils = FileUtils(str(tmp_path), None, None)
+    assert utils.percentage_of_formats(str(tmp_path)) == {"txt": 2}
+    folder_types = utils.percentage_of_folder_types(str(tmp_path))
+    assert folder_types["node"] == 1 and folder_types["rust"] == 1
+    assert folder_types["other"] == 1
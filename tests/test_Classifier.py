@@ -1,9 +1,18 @@
 import os
+import subprocess
+import sys
 
 import pytest
+from rich.console import Console
 from typer.testing import CliRunner
 
+import src.Classifier
 from src.Classifier import Classifier
+from src.Classifier import EMBEDDINGDIR
+from src.Classifier import TOPICMODELDIR
+from src.Classifier import user_cache_dir
+from src.main import app
+from src.MoveExecutor import MoveExecutor
 
 runner = CliRunner()
 
@@ -54,5 +63,309 @@ def test_classify(classifier):
     os.rmdir("test_input")
 
 
+def test_classify_parallel(classifier, tmp_path):
+    # Create temporary folders and files
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    directory.mkdir()
+    names = [f"file_{idx}.{ext}" for idx in range(20) for ext in ("txt", "mp3", "zzz")]
+    for name in names:
+        (directory / name).write_text("Test content")
+
+    # Classify with several workers
+    classifier.workers = 4
+    classifier.classify(classifier.file_utility.formats, str(output), str(directory))
+
+    # Check that the layout matches the serial classification
+    assert sorted(os.listdir(output)) == ["audio", "document"]
+    assert len(os.listdir(output / "document")) == 20
+    assert len(os.listdir(output / "audio")) == 20
+    assert sorted(os.listdir(directory)) == sorted(
+        n for n in names if n.endswith("zzz")
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_classify_recursive_same_name(tmp_path, workers):
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    for folder, content in (("a", "one"), ("b", "two")):
+        (directory / folder).mkdir(parents=True)
+        (directory / folder / "readme.txt").write_text(content)
+    classifier = Classifier(path=str(directory), workers=workers, max_depth=None)
+
+    classifier.classify(classifier.file_utility.formats, str(output), str(directory))
+
+    # one file is moved, the other is left in place instead of being overwritten
+    moved = (output / "document" / "readme.txt").read_text()
+    left = [path.read_text() for path in directory.glob("*/readme.txt")]
+    assert sorted([moved] + left) == ["one", "two"]
+
+    # the first submitted move wins, whatever the number of workers, and a skipped
+    # move (here a missing source) does not hold on to its destination
+    for folder, content in (("c", "three"), ("e", "four")):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "readme.txt").write_text(content)
+    with MoveExecutor(Console(quiet=True), workers=workers) as mover:
+        for folder in ("missing", "c", "e"):
+            mover.submit("readme.txt", str(tmp_path / folder), str(tmp_path / "d"))
+    assert (tmp_path / "d" / "readme.txt").read_text() == "three"
+    assert mover.collisions == [
+        (str(tmp_path / "e" / "readme.txt"), str(tmp_path / "d" / "readme.txt"))
+    ]
+    assert not mover._claimed
+
+
+def test_classify_incremental_file_added_mid_run(tmp_path):
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    directory.mkdir()
+    (directory / "notes.zzz").write_text("Test content")
+    classifier = Classifier(
+        path=str(directory), incremental=True, content_detection="off"
+    )
+    route = classifier.route
+
+    def route_and_drop(record, *args):
+        # a file written once the folder has been listed
+        (directory / "late.txt").write_text("late")
+        classifier.route = route
+        return route(record, *args)
+
+    classifier.route = route_and_drop
+    classifier.classify(classifier.file_utility.formats, str(output), str(directory))
+    classifier.classify(classifier.file_utility.formats, str(output), str(directory))
+
+    assert (output / "document" / "late.txt").read_text() == "late"
+
+
+def test_classify_incremental_file_rewritten_in_place(tmp_path):
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    directory.mkdir()
+    (directory / "scan").write_bytes(b"not known yet")
+    classifier = Classifier(path=str(directory), incremental=True)
+    classifier.classify(classifier.file_utility.formats, str(output), str(directory))
+    assert (directory / "scan").exists()
+
+    # the directory mtime does not change when a file is rewritten in place
+    (directory / "scan").write_bytes(b"%PDF-1.4\n%%EOF\n")
+    classifier.classify(classifier.file_utility.formats, str(output), str(directory))
+
+    assert (output / "document" / "scan").exists()
+
+
+def test_scan_index_signature(tmp_path):
+    formats = Classifier(path=str(tmp_path)).file_utility.formats
+
+    def signature(**kwargs):
+        classifier = Classifier(path=str(tmp_path), **kwargs)
+        index = classifier.get_routing_index(formats)
+        with classifier.get_scan_index(index, str(tmp_path), str(tmp_path)) as scan:
+            return scan.connection.execute(
+                "SELECT value FROM meta WHERE key = 'signature'"
+            ).fetchone()[0]
+
+    assert signature() == signature()
+    assert signature(content_detection="all") != signature()
+    assert signature(model_path="model.pkl") != signature()
+
+
+def test_invalid_config_rule(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / ".classifier-master.conf").write_text("Big: size>lots\n")
+    directory = tmp_path / "input"
+    directory.mkdir()
+
+    result = runner.invoke(app, ["--directory", str(directory)])
+
+    assert result.exit_code == 2
+    assert result.exception is None or isinstance(result.exception, SystemExit)
+    assert 'Invalid rule "Big: size>lots"' in result.output
+
+
+def test_startup_imports():
+    # plain extension runs must not pay for the heavy optional dependencies
+    modules = ("gensim", "sklearn", "pandas", "numpy")
+    code = (
+        "import sys, src.main; " f"print([m for m in {modules!r} if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_classify_with_rules(classifier, tmp_path):
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    archive = tmp_path / "archive"
+    directory.mkdir()
+    for name in ("invoice-01.pdf", "notes.txt", "~lock.txt"):
+        (directory / name).write_text("Test content")
+    (directory / "big.bin").write_bytes(b"0" * 4096)
+    config = tmp_path / "classifier-master.conf"
+    config.write_text(
+        "IGNORE: ~*\n" f"Invoices: *invoice*.pdf -> {archive}\n" "Large: size>=4KB\n"
+    )
+    classifier.config = str(config)
+
+    classifier.classify(classifier.file_utility.formats, str(output), str(directory))
+
+    assert os.listdir(directory) == ["~lock.txt"]
+    assert os.listdir(archive) == ["invoice-01.pdf"]
+    assert os.listdir(output / "large") == ["big.bin"]
+    assert os.listdir(output / "document") == ["notes.txt"]
+
+
+def test_classify_stats(tmp_path):
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    directory.mkdir()
+    for name in ("a.txt", "b.mp3", "c.zzz"):
+        (directory / name).write_text("Test content")
+    classifier = Classifier(path=str(directory), stats=True)
+
+    classifier.classify(classifier.file_utility.formats, str(output), str(directory))
+
+    data = classifier.stats.to_dict()
+    assert data["counters"]["scanned"] == 3
+    assert data["counters"]["moved"] == 2
+    assert data["counters"]["skipped"] == 1
+    assert data["counters"]["bytes"] == 2 * len("Test content")
+    assert {"scan", "route", "move", "print"} <= set(data["stages"])
+
+
+def test_classify_by_semantic_cluster(classifier, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    directory.mkdir()
+    corpus = {
+        "cat1.txt": "cats purr and cats chase the mouse",
+        "cat2.txt": "the cat and the mouse, cats purr",
+        "market1.txt": "stock market shares fall as investors sell",
+        "market2.txt": "investors buy shares, the stock market rises",
+    }
+    for name, text in corpus.items():
+        (directory / name).write_text(text)
+
+    classifier.classify_by_semantic_cluster(
+        str(output), str(directory), ["txt"], num_clusters=2
+    )
+
+    clusters = {path.name: path.parent.name for path in output.glob("*/*.txt")}
+    assert set(clusters) == set(corpus)
+    assert clusters["cat1.txt"] == clusters["cat2.txt"]
+    assert clusters["market1.txt"] == clusters["market2.txt"]
+    assert clusters["cat1.txt"] != clusters["market1.txt"]
+    # the embeddings are kept for the next run, out of the classified folder
+    cache_dir = user_cache_dir(EMBEDDINGDIR, str(directory))
+    assert cache_dir.startswith(str(tmp_path / "cache"))
+    assert os.path.exists(os.path.join(cache_dir, "tfidf-svd", "vectors.npy"))
+    assert not list(directory.glob(".classifier-*"))
+
+
+def test_classify_by_topic_modeling_keeps_model_in_user_cache(
+    classifier, tmp_path, monkeypatch
+):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    directory.mkdir()
+    (directory / "cats.txt").write_text("cats purr and cats chase the mouse")
+    (directory / "market.txt").write_text("investors buy shares on the market")
+
+    classifier.classify_by_topic_modeling(str(output), str(directory), ["txt"])
+
+    assert len(list(output.glob("*/*.txt"))) == 2
+    model_dir = user_cache_dir(TOPICMODELDIR, str(directory))
+    assert model_dir.startswith(str(tmp_path / "cache"))
+    assert os.listdir(model_dir)
+    assert not list(directory.glob(".classifier-*"))
+
+
+def test_classify_by_semantic_cluster_skips_unreadable_files(
+    classifier, tmp_path, monkeypatch
+):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    directory.mkdir()
+    (directory / "cats.txt").write_text("cats purr and cats chase the mouse")
+    (directory / "dogs.txt").write_text("dogs bark and dogs chase the cat")
+    (directory / "market.txt").write_text("investors buy shares on the market")
+    hash_file = src.Classifier.hash_file
+
+    def flaky_hash(path):
+        if path.endswith("market.txt"):
+            raise PermissionError(path)
+        return hash_file(path)
+
+    monkeypatch.setattr(src.Classifier, "hash_file", flaky_hash)
+    classifier.classify_by_semantic_cluster(
+        str(output), str(directory), ["txt"], num_clusters=2
+    )
+
+    moved = sorted(path.name for path in output.glob("*/*.txt"))
+    assert moved == ["cats.txt", "dogs.txt"]
+    assert (directory / "market.txt").exists()
+
+
+def test_classify_unknown_extension_with_model(tmp_path):
+    training = tmp_path / "training"
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    training.mkdir()
+    directory.mkdir()
+    for idx in range(5):
+        (training / f"holiday_photo_{idx}.jpg").write_bytes(b"\x00\x11" * 500)
+        (training / f"meeting_notes_{idx}.txt").write_text("notes " * 10)
+    (directory / "holiday_photo_9.jpx").write_bytes(b"\x00\x11" * 450)
+    (directory / "meeting_notes_9.nfo").write_text("notes " * 12)
+    (directory / "kept.txt").write_text("notes")
+
+    model_path = str(tmp_path / "model.pkl")
+    classifier = Classifier(path=str(directory), model_path=model_path)
+    classifier.train_fallback_model(str(training))
+    classifier = Classifier(path=str(directory), model_path=model_path)
+    classifier.classify(classifier.file_utility.formats, str(output), str(directory))
+
+    assert (output / "document" / "kept.txt").exists()
+    assert (output / "image" / "holiday_photo_9.jpx").exists()
+    assert (output / "document" / "meeting_notes_9.nfo").exists()
+
+
+def test_classify_by_size_and_age(classifier, tmp_path):
+    directory = tmp_path / "input"
+    directory.mkdir()
+    for idx, size in enumerate([10, 2000, 5000, 3 << 20]):
+        path = directory / f"file{idx}.bin"
+        path.write_bytes(b"x" * size)
+        os.utime(path, (1_000_000 + idx, 1_000_000 + idx))
+
+    classifier.classify_by_oldest(str(tmp_path / "old"), str(directory), 2)
+    assert sorted(os.listdir(tmp_path / "old" / "oldest")) == ["file0.bin", "file1.bin"]
+
+    classifier.classify_by_most_recent(str(tmp_path / "new"), str(directory), 1)
+    assert os.listdir(tmp_path / "new" / "most-recent") == ["file3.bin"]
+
+    for folder in ("old/oldest", "new/most-recent"):
+        for name in os.listdir(tmp_path / folder):
+            os.rename(tmp_path / folder / name, directory / name)
+    classifier.classify_by_size(str(directory), str(directory), [1 << 10, 1 << 20])
+    assert sorted(os.listdir(directory)) == ["0-1KB", "1KB-1MB", "1MB+"]
+    assert sorted(os.listdir(directory / "1KB-1MB")) == ["file1.bin", "file2.bin"]
+
+    classifier.classify_by_size_range(
+        str(tmp_path / "range"), str(directory / "1KB-1MB"), 0, 3000
+    )
+    assert os.listdir(tmp_path / "range" / "0-3000B") == ["file1.bin"]
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from src.Classifier import Classifier
+from src.Deduplicator import Deduplicator
+from src.Deduplicator import HashCache
+from src.Deduplicator import PARTIALBLOCK
+from src.Scanner import scan
+
+
+def test_groups_identical_files(tmp_path):
+    block = os.urandom(PARTIALBLOCK)
+    big = block * 3 + block
+    (tmp_path / "a.bin").write_bytes(big)
+    (tmp_path / "b.bin").write_bytes(big)
+    # same size, same first and last blocks, different middle
+    (tmp_path / "c.bin").write_bytes(block + b"x" * PARTIALBLOCK * 2 + block)
+    (tmp_path / "d.txt").write_text("same")
+    (tmp_path / "e.txt").write_text("same")
+    (tmp_path / "f.txt").write_text("diff")
+    (tmp_path / "empty1").write_text("")
+    (tmp_path / "empty2").write_text("")
+
+    with HashCache(str(tmp_path / "hashes.db")) as cache:
+        groups = Deduplicator(cache).groups(scan(str(tmp_path)))
+        names = sorted(sorted(record.name for record in group) for group in groups)
+        assert names == [["a.bin", "b.bin"], ["d.txt", "e.txt"]]
+
+        record = next(r for r in scan(str(tmp_path)) if r.name == "a.bin")
+        assert cache.get(record, "partial") and cache.get(record, "full")
+
+
+@pytest.mark.parametrize("mode", ["move", "link", "skip"])
+def test_classify_duplicates(tmp_path, monkeypatch, mode):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    directory = tmp_path / "input"
+    directory.mkdir()
+    (directory / "notes.txt").write_text("notes")
+    os.utime(directory / "notes.txt", (1_000_000, 1_000_000))
+    (directory / "notes copy.txt").write_text("notes")
+
+    classifier = Classifier(path=str(directory), duplicates=mode)
+    classifier.classify(classifier.file_utility.formats, str(directory), str(directory))
+
+    document = directory / "document"
+    assert (document / "notes.txt").exists()
+    if mode == "move":
+        assert (directory / "duplicates" / "notes copy.txt").exists()
+    elif mode == "link":
+        assert os.path.samefile(document / "notes copy.txt", document / "notes.txt")
+    else:
+        assert (directory / "notes copy.txt").exists()
+
+
+def test_link_duplicate_when_original_collides(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    directory.mkdir()
+    (directory / "notes.txt").write_text("notes")
+    os.utime(directory / "notes.txt", (1_000_000, 1_000_000))
+    (directory / "notes copy.txt").write_text("notes")
+    (output / "document").mkdir(parents=True)
+    (output / "document" / "notes.txt").write_text("unrelated")
+
+    classifier = Classifier(path=str(directory), duplicates="link")
+    classifier.classify(classifier.file_utility.formats, str(output), str(directory))
+
+    assert (output / "document" / "notes.txt").read_text() == "unrelated"
+    assert (directory / "notes.txt").read_text() == "notes"
+    assert (output / "document" / "notes copy.txt").read_text() == "notes"
+    assert os.path.samefile(
+        output / "document" / "notes copy.txt", directory / "notes.txt"
+    )
@@ -0,0 +1,57 @@
+import errno
+import os
+
+import pytest
+
+import src.DeviceMover
+from src.DeviceMover import copy_move
+from src.DeviceMover import DeviceMover
+
+
+def test_cross_device_move_copies_once_detected(tmp_path, monkeypatch):
+    source = tmp_path / "input"
+    destination = tmp_path / "output"
+    source.mkdir()
+    destination.mkdir()
+    for name in ("a.bin", "b.bin"):
+        (source / name).write_bytes(os.urandom(100_000))
+    os.chmod(source / "a.bin", 0o640)
+    os.utime(source / "a.bin", (1_000_000, 1_000_000))
+    content = (source / "a.bin").read_bytes()
+
+    # renames out of the input folder behave as if it were another filesystem
+    renames = []
+    rename = os.rename
+
+    def cross_device_rename(src, dst):
+        renames.append(src)
+        if os.path.dirname(src) == str(source):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        rename(src, dst)
+
+    monkeypatch.setattr(src.DeviceMover.os, "rename", cross_device_rename)
+    mover = DeviceMover()
+    mover.move(str(source / "a.bin"), str(destination / "a.bin"))
+    mover.move(str(source / "b.bin"), str(destination / "b.bin"))
+
+    assert os.listdir(source) == []
+    assert sorted(os.listdir(destination)) == ["a.bin", "b.bin"]
+    assert (destination / "a.bin").read_bytes() == content
+    st = os.stat(destination / "a.bin")
+    assert st.st_mode & 0o777 == 0o640 and st.st_mtime == 1_000_000
+    # the EXDEV pair is remembered: b.bin is copied without trying a rename first
+    assert [os.path.basename(path) for path in renames if str(source) in path] == [
+        "a.bin"
+    ]
+
+
+def test_short_copy_keeps_source(tmp_path, monkeypatch):
+    (tmp_path / "a.bin").write_bytes(b"x" * 1000)
+
+    # a zero-copy call returning 0 before the end of the file
+    monkeypatch.setattr(src.DeviceMover, "copy_file", lambda in_fd, out_fd: None)
+    with pytest.raises(OSError):
+        copy_move(str(tmp_path / "a.bin"), str(tmp_path / "b.bin"))
+
+    assert os.listdir(tmp_path) == ["a.bin"]
+    assert (tmp_path / "a.bin").read_bytes() == b"x" * 1000
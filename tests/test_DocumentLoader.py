@@ -0,0 +1,32 @@
+from src import DocumentLoader
+from src.DocumentLoader import iter_documents
+from src.DocumentLoader import read_document
+
+
+def test_read_document_caps_and_samples(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_text("head-" + "x" * 1000 + "-tail", encoding="utf-8")
+
+    assert read_document(str(path), max_bytes=5) == "head-"
+    assert read_document(str(path), max_bytes=10, sample="headtail") == "head-\n-tail"
+    assert len(read_document(str(path), max_bytes=None)) == 1010
+
+
+def test_read_document_mmap_and_split_characters(tmp_path, monkeypatch):
+    # Force the mmap path and cut a two-byte character in half
+    monkeypatch.setattr(DocumentLoader, "MMAPTHRESHOLD", 1)
+    path = tmp_path / "accents.txt"
+    path.write_text("é" * 100, encoding="utf-8")
+
+    assert read_document(str(path), max_bytes=5) == "éé"
+
+
+def test_iter_documents_is_lazy(tmp_path):
+    for idx in range(3):
+        (tmp_path / f"doc_{idx}.txt").write_text(f"document {idx}")
+    (tmp_path / "image.png").write_bytes(b"\x89PNG")
+
+    documents = iter_documents(str(tmp_path), ["txt"])
+
+    assert not isinstance(documents, list)
+    assert sorted(documents) == ["document 0", "document 1", "document 2"]
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from src.MagicDetector import MagicDetector
+
+
+@pytest.fixture
+def detector():
+    return MagicDetector(cache_size=2)
+
+
+@pytest.mark.parametrize(
+    "header, ext",
+    [
+        (b"%PDF-1.7\n", "pdf"),
+        (b"\x89PNG\r\n\x1a\n\x00\x00", "png"),
+        (b"\xff\xd8\xff\xe0\x00\x10JFIF", "jpg"),
+        (b"RIFF\x00\x00\x00\x00WAVEfmt ", "wav"),
+        (b"\x00\x00\x00\x18ftypM4A \x00\x00", "m4a"),
+        (b"\x00\x00\x00\x18ftypisom\x00\x00", "mp4"),
+        (
+            b"PK\x03\x04"
+            + b"\x00" * 26
+            + b"mimetypeapplication/vnd.oasis.opendocument.text",
+            "odt",
+        ),
+        (b"PK\x03\x04\x14\x00", "zip"),
+        (b"  <!DOCTYPE html><html>", "html"),
+        (b"plain text", None),
+        (b"", None),
+    ],
+)
+def test_match(detector, header, ext):
+    assert detector.match(header) == ext
+
+
+def test_detect_uses_cache(detector, tmp_path):
+    path = tmp_path / "scan"
+    path.write_bytes(b"%PDF-1.4\n" + b"x" * 1024)
+
+    assert detector.detect(str(path)) == "pdf"
+
+    # The cache is keyed by (inode, mtime, size): same key, the file is not read again
+    st = os.stat(path)
+    with open(path, "r+b") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert detector.detect(str(path)) == "pdf"
+
+    # A new mtime is a new key
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert detector.detect(str(path)) == "png"
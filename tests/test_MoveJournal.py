@@ -0,0 +1,105 @@
+import errno
+import json
+import os
+
+from rich.console import Console
+
+import src.DeviceMover
+from src.Classifier import Classifier
+from src.MoveExecutor import MoveExecutor
+from src.MoveJournal import MoveJournal
+from src.MoveJournal import read_journal
+from src.MoveJournal import undo_journal
+
+
+def test_classify_journal_then_undo(tmp_path):
+    directory = tmp_path / "input"
+    directory.mkdir()
+    (directory / "notes.txt").write_text("notes")
+    (directory / "song.mp3").write_text("song")
+    journal = str(tmp_path / "moves.journal")
+
+    classifier = Classifier(path=str(directory), journal_path=journal)
+    classifier.classify(classifier.file_utility.formats, str(directory), str(directory))
+    classifier.journal.close()
+
+    assert sorted(read_journal(journal)) == [
+        (str(directory / "notes.txt"), str(directory / "document" / "notes.txt")),
+        (str(directory / "song.mp3"), str(directory / "audio" / "song.mp3")),
+    ]
+
+    classifier.undo(journal)
+    assert sorted(path.name for path in directory.iterdir()) == [
+        "notes.txt",
+        "song.mp3",
+    ]
+
+
+def test_journal_inside_classified_folder(tmp_path):
+    (tmp_path / "notes.txt").write_text("notes")
+    journal = str(tmp_path / "moves.txt")
+
+    classifier = Classifier(path=str(tmp_path), journal_path=journal)
+    classifier.classify(classifier.file_utility.formats, str(tmp_path), str(tmp_path))
+    classifier.journal.close()
+
+    assert (tmp_path / "document" / "notes.txt").exists()
+    assert read_journal(journal) == [
+        (str(tmp_path / "notes.txt"), str(tmp_path / "document" / "notes.txt"))
+    ]
+
+
+def test_resume_skips_recorded_moves(tmp_path):
+    (tmp_path / "a.txt").write_text("a")
+    (tmp_path / "b.txt").write_text("b")
+    journal = str(tmp_path / "moves.journal")
+    with open(journal, "w") as f:
+        f.write(json.dumps([str(tmp_path / "a.txt"), str(tmp_path / "out/a.txt")]))
+        # a line torn by a crash
+        f.write('\n["' + str(tmp_path))
+
+    with MoveJournal(journal, resume=True) as resumed:
+        with MoveExecutor(Console(), verbose=False, journal=resumed) as mover:
+            mover.submit("a.txt", str(tmp_path), str(tmp_path / "out"))
+            mover.submit("b.txt", str(tmp_path), str(tmp_path / "out"))
+
+    assert (tmp_path / "a.txt").exists()
+    assert (tmp_path / "out" / "b.txt").exists()
+    assert [source for source, _ in read_journal(journal)] == [
+        str(tmp_path / "a.txt"),
+        str(tmp_path / "b.txt"),
+    ]
+
+
+def test_undo_cross_device(tmp_path, monkeypatch):
+    (tmp_path / "out").mkdir()
+    (tmp_path / "out" / "a.txt").write_text("a")
+    journal = str(tmp_path / "moves.journal")
+    with MoveJournal(journal) as moves:
+        moves.record(str(tmp_path / "a.txt"), str(tmp_path / "out" / "a.txt"))
+
+    rename = os.rename
+
+    def cross_device_rename(src, dst):
+        if os.path.dirname(src) == str(tmp_path / "out"):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        rename(src, dst)
+
+    monkeypatch.setattr(src.DeviceMover.os, "rename", cross_device_rename)
+    assert undo_journal(journal) == (1, [])
+    assert (tmp_path / "a.txt").read_text() == "a"
+    assert not (tmp_path / "out").exists()
+
+
+def test_journal_is_never_overwritten(tmp_path):
+    journal = str(tmp_path / "moves.journal")
+    with MoveJournal(journal) as moves:
+        moves.record("a.txt", "out/a.txt")
+    with MoveJournal(journal) as moves:
+        assert not moves.is_done("a.txt")
+        moves.record("b.txt", "out/b.txt")
+
+    assert [os.path.basename(source) for source, _ in read_journal(journal)] == [
+        "a.txt",
+        "b.txt",
+    ]
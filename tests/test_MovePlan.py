@@ -0,0 +1,95 @@
+import os
+
+import pytest
+from rich.console import Console
+
+from src.Classifier import Classifier
+from src.MoveExecutor import MoveExecutor
+from src.MovePlan import MovePlan
+
+
+@pytest.mark.parametrize("plan_file", ["plan.json", "plan.csv"])
+def test_dry_run_then_execute(tmp_path, plan_file):
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    directory.mkdir()
+    (directory / "notes.txt").write_text("notes")
+    (directory / "song.mp3").write_text("song")
+    (directory / "photo.png").write_text("photo")
+    (output / "image").mkdir(parents=True)
+    (output / "image" / "photo.png").write_text("older photo")
+
+    classifier = Classifier(path=str(directory), dry_run=True)
+    classifier.classify(classifier.file_utility.formats, str(output), str(directory))
+    plan = classifier.plan
+
+    # nothing moved yet
+    assert sorted(os.listdir(directory)) == ["notes.txt", "photo.png", "song.mp3"]
+    assert plan.sorted_moves() == [
+        (str(directory / "song.mp3"), str(output / "audio" / "song.mp3")),
+        (str(directory / "notes.txt"), str(output / "document" / "notes.txt")),
+    ]
+    assert plan.directories == {str(output / "audio"), str(output / "document")}
+    assert plan.collisions == [
+        (str(directory / "photo.png"), str(output / "image" / "photo.png"))
+    ]
+
+    plan.save(str(tmp_path / plan_file))
+    loaded = MovePlan.load(str(tmp_path / plan_file))
+    assert loaded.sorted_moves() == plan.sorted_moves()
+    assert loaded.directories == plan.directories
+    assert loaded.collisions == plan.collisions
+
+    # a destination written since the plan was made is not overwritten either
+    (output / "document").mkdir()
+    (output / "document" / "notes.txt").write_text("newer notes")
+    with MoveExecutor(Console(), verbose=False) as mover:
+        loaded.execute(mover)
+    assert sorted(os.listdir(directory)) == ["notes.txt", "photo.png"]
+    assert (output / "audio" / "song.mp3").exists()
+    assert (output / "image" / "photo.png").read_text() == "older photo"
+    assert (output / "document" / "notes.txt").read_text() == "newer notes"
+    assert len(loaded.collisions) == 2
+
+
+def test_dry_run_matches_real_run(tmp_path):
+    directory = tmp_path / "input"
+    output = tmp_path / "output"
+    directory.mkdir()
+    (directory / "photo.png").write_text("new")
+    (output / "image").mkdir(parents=True)
+    (output / "image" / "photo.png").write_text("older")
+
+    dry_run = Classifier(path=str(directory), dry_run=True)
+    dry_run.classify(dry_run.file_utility.formats, str(output), str(directory))
+    assert len(dry_run.plan) == 0
+    assert len(dry_run.plan.collisions) == 1
+
+    classifier = Classifier(path=str(directory))
+    classifier.classify(classifier.file_utility.formats, str(output), str(directory))
+    assert (output / "image" / "photo.png").read_text() == "older"
+    assert (directory / "photo.png").read_text() == "new"
+
+
+def test_execute_plan_is_timed(tmp_path):
+    directory = tmp_path / "input"
+    directory.mkdir()
+    (directory / "song.mp3").write_text("song")
+    plan = MovePlan()
+    plan.submit("song.mp3", str(directory), str(tmp_path / "output"))
+    plan.save(str(tmp_path / "plan.json"))
+
+    classifier = Classifier(path=str(directory), stats=True)
+    classifier.execute_plan(str(tmp_path / "plan.json"))
+
+    assert classifier.stats.to_dict()["counters"]["moved"] == 1
+    assert classifier.stats.to_dict()["stages"]["move"]["calls"] == 1
+
+
+def test_planned_destinations_collide():
+    plan = MovePlan()
+    plan.add("a/report.pdf", "out/document/report.pdf")
+    plan.add("b/report.pdf", "out/document/report.pdf")
+
+    assert plan.moves == [("a/report.pdf", "out/document/report.pdf")]
+    assert plan.collisions == [("b/report.pdf", "out/document/report.pdf")]
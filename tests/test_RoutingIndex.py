@@ -0,0 +1,61 @@
+import pytest
+
+from src.FileUtils import FileUtils
+from src.RoutingIndex import RoutingIndex
+
+
+@pytest.fixture
+def index():
+    return RoutingIndex.from_formats(FileUtils.formats)
+
+
+def test_lookup(index):
+    assert index.category("txt") == "document"
+    assert index.category("mp3") == "audio"
+    assert index.category("unknown-ext") is None
+
+
+def test_compound_extension(index):
+    assert index.split_extension("backup.TAR.GZ") == "tar.gz"
+    assert index.category(index.split_extension("backup.tar.gz")) == "archive"
+    assert index.split_extension("notes.txt") == "txt"
+    assert index.split_extension(".bashrc") == ""
+    assert index.split_extension("Makefile") == ""
+
+
+def test_priority_rules(index):
+    assert index.category("py") == "executable"
+    assert index.category("cgi") == "executable"
+    assert index.category("odp") == "document"
+    assert index.category("png") == "image"
+
+
+def test_config_overrides(tmp_path):
+    config = tmp_path / "classifier-master.conf"
+    config.write_text("IGNORE: part, desktop\nScripts: py, sh\n")
+
+    index = RoutingIndex.from_config(FileUtils.formats, str(config))
+
+    assert index.is_ignored("part")
+    assert index.category("sh") == "scripts"
+    assert index.category("py") == "scripts"
+    assert index.category("cgi") == "executable"
+    with pytest.raises(TypeError):
+        index.table["txt"] = "other"
+
+
+def test_config_rules(tmp_path):
+    config = tmp_path / "classifier-master.conf"
+    config.write_text(
+        "Scripts: py, sh\n"
+        "Docs: pdf -> C:\\Users\\me\\Docs\n"
+        "Photos: re:^IMG_\\d{4}, *.heic\n"
+    )
+
+    index = RoutingIndex.from_config(FileUtils.formats, str(config))
+
+    assert index.category("sh") == "scripts"
+    assert index.category("pdf") == "document"
+    assert [rule.category for rule in index.rules] == ["Docs", "Photos"]
+    assert index.rules.rules[0].destination == "C:\\Users\\me\\Docs"
+    assert not index.rules.needs_stat
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from src.RuleEngine import is_rule
+from src.RuleEngine import parse_rule
+from src.RuleEngine import RuleSet
+from src.Scanner import FileRecord
+
+NOW = time.time()
+DAY = 86400
+
+
+def record(name, size=100, age_days=0):
+    ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+    mtime = NOW - age_days * DAY
+    return FileRecord("/tmp", name, ext, size, mtime, mtime, 0)
+
+
+def test_parse_rule():
+    rule = parse_rule("Big", "iso, *.img, size>=1GB, age<30d -> /mnt/big")
+    assert rule.extensions == {"iso"}
+    assert rule.destination == "/mnt/big"
+    assert rule.min_size == 1 << 30
+    assert rule.max_age == 30 * DAY
+    assert parse_rule("Docs", r"pdf -> C:\Users\me\Docs").destination == (
+        r"C:\Users\me\Docs"
+    )
+    assert not is_rule("pdf, docx")
+    assert is_rule("re:^IMG_\\d{3,4}")
+    with pytest.raises(ValueError):
+        parse_rule("Bad", "size>lots")
+
+
+def test_rule_set_matching():
+    rules = RuleSet(
+        [
+            parse_rule("IGNORE", "~*"),
+            parse_rule("Invoices", r"*invoice*.pdf, re:^INV-\d{2,4}"),
+            parse_rule("Large", "size>10MB"),
+            parse_rule("Old", "pdf, age>=365d"),
+            parse_rule("Scans", "re:scan"),
+        ]
+    )
+    assert rules.needs_stat
+    assert rules.match(record("~lock.docx")).category == "IGNORE"
+    assert rules.match(record("Invoice-march.PDF"), NOW).category == "Invoices"
+    assert rules.match(record("inv-0042.txt"), NOW).category == "Invoices"
+    assert rules.match(record("movie.mkv", size=20 << 20), NOW).category == "Large"
+    assert rules.match(record("report.pdf", age_days=400), NOW).category == "Old"
+    assert rules.match(record("report.pdf", age_days=3), NOW) is None
+    assert rules.match(record("my_scan.png"), NOW).category == "Scans"
+
+
+def test_rule_set_falls_through_rejected_pattern():
+    rules = RuleSet(
+        [
+            parse_rule("Recent", "*.log, age<1d"),
+            parse_rule("Logs", "re:\\.log$"),
+        ]
+    )
+    assert rules.match(record("app.log"), NOW).category == "Recent"
+    assert rules.match(record("app.log", age_days=2), NOW).category == "Logs"
+
+
+def test_rule_set_keeps_declaration_order():
+    rules = RuleSet(
+        [
+            parse_rule("A", "*.log, size>1GB"),
+            parse_rule("B", "re:app"),
+            parse_rule("C", "log"),
+        ]
+    )
+    assert rules.match(record("app.log", size=10), NOW).category == "B"
+    assert rules.match(record("db.log", size=10), NOW).category == "C"
+    assert rules.match(record("db.log", size=2 << 30), NOW).category == "A"
+
+
+def test_rule_regex_groups_are_rejected():
+    # merged into one alternation, a backreference would point to another group
+    with pytest.raises(ValueError, match="Groups are not supported"):
+        parse_rule("Pairs", r"re:^(\w)\1")
+    # two rules with the same group name would not compile together
+    with pytest.raises(ValueError, match="Groups are not supported"):
+        parse_rule("Invoices", r"re:^(?P<id>INV-\d+)")
+    with pytest.raises(ValueError, match="Invalid regex"):
+        parse_rule("Broken", r"re:^\1")
+    rules = RuleSet([parse_rule("A", "re:^(?:IMG)_"), parse_rule("B", r"re:^(?:\w)a")])
+    assert rules.match(record("aa.txt"), NOW).category == "B"
+
+
+if __name__ == "__main__":
+    pytest.main()
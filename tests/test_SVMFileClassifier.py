@@ -0,0 +1,24 @@
+from src.model.SVMFileClassifier import SGDFileClassifier
+
+
+def test_partial_fit_and_reload(tmp_path):
+    X = [
+        ["pdf", "lecture notes calculus"],
+        ["pdf", "calculus homework"],
+        ["mp3", "podcast episode"],
+        ["mp3", "podcast interview"],
+    ]
+    y = ["course", "course", "audio", "audio"]
+    classifier = SGDFileClassifier(classes=["audio", "course", "image"])
+    classifier.fit(X, y)
+    assert list(classifier.predict([["pdf", "calculus exam"]])) == ["course"]
+
+    # a correction for a label never seen in training, without refitting
+    for _ in range(5):
+        classifier.partial_fit([["png", "holiday photo"]], ["image"])
+    path = str(tmp_path / "model.pkl")
+    classifier.save(path)
+
+    reloaded = SGDFileClassifier.load(path)
+    assert list(reloaded.predict([["png", "holiday photo"]])) == ["image"]
+    assert list(reloaded.predict([["mp3", "podcast"]])) == ["audio"]
@@ -0,0 +1,70 @@
+import os
+
+from src.FileUtils import FileUtils
+from src.ScanIndex import ScanIndex
+from src.Scanner import scan
+from src.Scanner import walk
+
+
+def test_scan(tmp_path):
+    # Create a file, a hidden file and a folder
+    (tmp_path / "report.PDF").write_text("Test content")
+    (tmp_path / ".hidden.txt").write_text("Hidden")
+    (tmp_path / "folder").mkdir()
+
+    records = list(scan(str(tmp_path)))
+
+    assert [record.name for record in records] == ["report.PDF"]
+    record = records[0]
+    assert record.ext == "pdf"
+    assert record.size == len("Test content")
+    assert record.path == os.path.join(str(tmp_path), "report.PDF")
+    assert record.inode == os.stat(record.path).st_ino
+
+    names = {record.name for record in scan(str(tmp_path), hidden=True, stat=False)}
+    assert names == {"report.PDF", ".hidden.txt"}
+    assert all(record.size is None for record in scan(str(tmp_path), stat=False))
+
+
+def test_walk_prunes_and_limits_depth(tmp_path):
+    # Create a small tree with a junk folder
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "top.txt").write_text("top")
+    (tmp_path / "a" / "one.txt").write_text("one")
+    (tmp_path / "a" / "b" / "two.txt").write_text("two")
+    (tmp_path / "node_modules" / "lib.js").write_text("lib")
+
+    def names(**kwargs):
+        return sorted(record.name for record in walk(str(tmp_path), **kwargs))
+
+    prune = FileUtils.pruned_folders()
+    assert names(prune=prune) == ["one.txt", "top.txt", "two.txt"]
+    assert names(prune=prune, max_depth=1) == ["one.txt", "top.txt"]
+    assert names(prune=prune, max_depth=0) == ["top.txt"]
+    assert names(prune=prune, exclude=[str(tmp_path / "a")]) == ["top.txt"]
+    assert "lib.js" in names()
+    # folders that are just as often the user's own are classified
+    assert not prune & {"test", "bin", "build", "pkg", "out", "dist", "vendor"}
+
+
+def test_scan_index(tmp_path):
+    (tmp_path / "notes.zzz").write_text("Test content")
+    record = next(scan(str(tmp_path)))
+    database = str(tmp_path / ".classifier.db")
+
+    with ScanIndex(database, signature="a") as index:
+        assert not index.unchanged(record)
+        index.remember(record, None)
+        mtime = os.stat(tmp_path).st_mtime_ns
+        index.remember_directories([(str(tmp_path), mtime)])
+
+    with ScanIndex(database, signature="a") as index:
+        assert index.unchanged(record)
+        assert index.directory_unchanged(str(tmp_path), mtime)
+
+    # A different routing signature or a full rescan forgets everything
+    with ScanIndex(database, signature="b") as index:
+        assert not index.unchanged(record)
+    with ScanIndex(database, signature="b", full_rescan=True) as index:
+        assert not index.directory_unchanged(str(tmp_path), mtime)
@@ -0,0 +1,50 @@
+from src.model.SemanticClusterer import EmbeddingCache
+from src.model.SemanticClusterer import SemanticClusterer
+
+
+def test_embedding_cache_grows_and_reloads(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), 2, capacity=1)
+    cache.add(["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    cache.add(["c"], [[0.5, 0.5]])
+
+    reloaded = EmbeddingCache(str(tmp_path), 2)
+    assert len(reloaded) == 3 and "c" in reloaded
+    assert reloaded.vectors[reloaded.rows["b"]].tolist() == [0.0, 1.0]
+
+
+def test_only_new_documents_are_embedded(tmp_path):
+    documents = {
+        "k0": "cats purr and chase the mouse",
+        "k1": "the cat sleeps, cats purr",
+        "k2": "stock market shares fall",
+        "k3": "investors sell stock market shares",
+    }
+    clusterer = SemanticClusterer(str(tmp_path), num_clusters=2, min_fit_size=2)
+    clusterer.embed(["k0", "k2"], [documents["k0"], documents["k2"]])
+
+    clusterer = SemanticClusterer(str(tmp_path), num_clusters=2, min_fit_size=2)
+    assert clusterer.missing(documents) == {"k1", "k3"}
+    clusterer.embed(["k1", "k3"], [documents["k1"], documents["k3"]])
+
+    labels = clusterer.cluster(list(documents))
+    assert labels[0] == labels[1] and labels[2] == labels[3]
+
+
+def test_small_embedder_is_refitted_when_the_corpus_grows(tmp_path):
+    documents = {
+        f"k{idx}": f"{topic} document number {idx}"
+        for idx, topic in enumerate(["cats purr", "stock market"] * 4)
+    }
+    clusterer = SemanticClusterer(str(tmp_path), num_clusters=2)
+    clusterer.embed(["k0", "k1"], [documents["k0"], documents["k1"]])
+    assert clusterer.embedder.dimensions == 1
+
+    clusterer = SemanticClusterer(str(tmp_path), num_clusters=2)
+    assert clusterer.missing(documents) == set(documents)
+    clusterer.embed(list(documents), list(documents.values()))
+    assert clusterer.embedder.dimensions == len(documents) - 1
+    assert len(clusterer.cache) == len(documents)
+
+    clusterer = SemanticClusterer(str(tmp_path), num_clusters=2)
+    assert clusterer.embedder.dimensions == len(documents) - 1
+    assert not clusterer.missing(documents)
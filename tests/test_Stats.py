@@ -0,0 +1,65 @@
+import json
+import time
+
+import pytest
+from rich.console import Console
+
+from src.Stats import NULLSTATS
+from src.Stats import Stats
+
+
+def test_timers_and_counters(tmp_path):
+    stats = Stats()
+    with stats.timer("list"):
+        time.sleep(0.01)
+    square = stats.timed("route", lambda x: x * x)
+    assert [square(x) for x in range(3)] == [0, 1, 4]
+    stats.count("moved", 2)
+    stats.count("moved")
+
+    data = stats.to_dict()
+    assert data["stages"]["list"]["seconds"] >= 0.01
+    assert data["stages"]["route"]["calls"] == 3
+    assert data["counters"] == {"moved": 3}
+
+    stats.save(str(tmp_path / "stats.json"))
+    assert json.loads((tmp_path / "stats.json").read_text())["counters"]["moved"] == 3
+    stats.save(str(tmp_path / "stats.prom"))
+    prometheus = (tmp_path / "stats.prom").read_text()
+    assert 'fileclassifier_stage_calls_total{stage="route"} 3' in prometheus
+    assert "fileclassifier_moved_total 3" in prometheus
+
+
+def test_timed_iter_excludes_consumer():
+    stats = Stats()
+    for _ in stats.timed_iter("scan", range(3)):
+        time.sleep(0.01)
+    timer = stats.to_dict()["stages"]["scan"]
+    assert timer["calls"] == 3
+    assert timer["seconds"] < 0.01
+
+
+def test_disabled():
+    fn = len
+    assert NULLSTATS.timed("route", fn) is fn
+    NULLSTATS.count("moved")
+    with NULLSTATS.timer("move"):
+        pass
+    assert NULLSTATS.to_dict()["stages"] == {}
+    assert NULLSTATS.to_dict()["counters"] == {}
+
+
+def test_table_sums_thread_time():
+    stats = Stats()
+    stats.started -= 1.0
+    stats.add_time("move", 3.0, calls=4)
+    console = Console(width=120, record=True)
+    console.print(stats.table())
+    output = console.export_text()
+    assert "wall clock" in output
+    assert "summed" in output
+    assert "3.000" in output
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,103 @@
+import os
+import zipfile
+import zlib
+
+import pytest
+
+from src.TextExtractor import TextExtractor
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    return TextExtractor(cache_dir=str(tmp_path / "cache"))
+
+
+def test_extract_docx(extractor, tmp_path):
+    path = tmp_path / "report.docx"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(
+            "word/document.xml",
+            "<w:document><w:body><w:p><w:r><w:t>Cats &amp; dogs</w:t></w:r></w:p>"
+            "<w:p><w:r><w:t>Second paragraph</w:t></w:r></w:p></w:body></w:document>",
+        )
+
+    text = extractor.extract(str(path))
+
+    assert "Cats & dogs" in text
+    assert "Second paragraph" in text
+    assert "<w:t>" not in text
+
+
+def test_extract_pdf(extractor, tmp_path):
+    content = zlib.compress(b"BT /F1 12 Tf (Hello \\(PDF\\)) Tj [(Wor) -20 (ld)] TJ ET")
+    path = tmp_path / "paper.pdf"
+    path.write_bytes(
+        b"%PDF-1.4\n1 0 obj << /Filter /FlateDecode >>\nstream\n"
+        + content
+        + b"\nendstream\nendobj\n%%EOF"
+    )
+
+    assert extractor.extract(str(path)).split("\n") == ["Hello (PDF)", "World"]
+
+
+def test_extraction_is_cached(extractor, tmp_path):
+    calls = []
+
+    def extract(path):
+        calls.append(path)
+        return "extracted"
+
+    TextExtractor.register("pages", extract)
+    try:
+        path = tmp_path / "book.pages"
+        path.write_bytes(b"binary")
+        assert extractor.extract(str(path)) == "extracted"
+        assert extractor.extract(str(path)) == "extracted"
+    finally:
+        del TextExtractor.EXTRACTORS["pages"]
+
+    assert len(calls) == 1
+
+
+def test_cache_is_keyed_on_the_text_cap(tmp_path):
+    TextExtractor.register("pages", lambda path: "a long extracted text")
+    try:
+        path = tmp_path / "book.pages"
+        path.write_bytes(b"binary")
+        cache_dir = str(tmp_path / "cache")
+        short = TextExtractor(cache_dir=cache_dir, max_bytes=6)
+        assert short.extract(str(path)) == "a long"
+        full = TextExtractor(cache_dir=cache_dir, max_bytes=None)
+        assert full.extract(str(path)) == "a long extracted text"
+    finally:
+        del TextExtractor.EXTRACTORS["pages"]
+
+
+def test_cache_prune_keeps_recently_used(tmp_path):
+    cache_dir = tmp_path / "cache" / "ab"
+    cache_dir.mkdir(parents=True)
+    for idx, name in enumerate(["old", "recent", "newest"]):
+        (cache_dir / f"{name}.txt").write_text("x" * 100)
+        os.utime(cache_dir / f"{name}.txt", (1_000_000 + idx, 1_000_000 + idx))
+
+    TextExtractor(cache_dir=str(tmp_path / "cache"), max_cache_bytes=250).prune()
+
+    assert sorted(path.name for path in cache_dir.iterdir()) == [
+        "newest.txt",
+        "recent.txt",
+    ]
+
+
+def test_broken_document_has_no_text(extractor, tmp_path):
+    path = tmp_path / "broken.docx"
+    path.write_bytes(b"not a zip archive at all")
+
+    assert extractor.extract(str(path)) == ""
+
+
+def test_binary_document_read_is_capped(extractor, tmp_path, monkeypatch):
+    monkeypatch.setattr("src.TextExtractor.READLIMIT", 8)
+    path = tmp_path / "legacy.doc"
+    path.write_bytes(b"\x00\x01head\x00\x02tail of a long document")
+
+    assert extractor.extract(str(path)) == "head"
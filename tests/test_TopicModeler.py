@@ -47,5 +47,38 @@ def test_lda_model(modeler):
     os.rmdir("test_input")
 
 
+def test_fit_infer_and_reload(modeler, tmp_path):
+    corpus = [
+        "The cat is on the mat.",
+        "The dog is in the yard.",
+        "The cat chases a mouse.",
+        "The dog barks at the cat.",
+    ]
+
+    # Train once, then infer the dominant topic of every document in one batch
+    modeler.num_topics = 2
+    modeler.fit(corpus)
+    topics = list(modeler.infer(corpus, batch_size=2))
+    assert len(topics) == len(corpus)
+    assert all(0 <= topic < 2 for topic in topics)
+
+    # A saved model is reused as is
+    modeler.save(str(tmp_path))
+    reloaded = TopicModeler()
+    assert reloaded.load(str(tmp_path))
+    assert reloaded.num_topics == 2
+    assert reloaded.lda.show_topic(0) == modeler.lda.show_topic(0)
+    assert len(list(reloaded.infer(corpus))) == len(corpus)
+    assert not TopicModeler().load(str(tmp_path / "missing"))
+
+
+def test_preprocess_many_keeps_order(modeler):
+    documents = [f"The cat number {idx} sleeps in the sun." for idx in range(50)]
+
+    # The process pool gives the same tokens, in the same order, as the inline path
+    expected = [modeler.preprocess(document) for document in documents]
+    assert modeler.preprocess_many(documents, processes=2, chunksize=8) == expected
+
+
 if __name__ == "__main__":
     pytest.main()
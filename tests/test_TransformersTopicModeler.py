@@ -0,0 +1,60 @@
+import sys
+import types
+
+import pytest
+
+from src.model import TransformersTopicModeler as module
+from src.model.TransformersTopicModeler import TransformersTopicModeler
+
+
+class StubPipeline:
+    """Echoes the first word of every input, recording the batches it was given."""
+
+    def __init__(self):
+        self.batches = []
+        self.tokenizer = types.SimpleNamespace(model_max_length=512)
+
+    def __call__(self, texts, batch_size, **kwargs):
+        assert batch_size == len(texts)
+        self.batches.append(list(texts))
+        return [[{"generated_text": text.split()[0]}] for text in texts]
+
+
+@pytest.fixture
+def pipelines(monkeypatch):
+    loaded = []
+
+    def pipeline(task, model, device):
+        loaded.append((task, model, device))
+        return StubPipeline()
+
+    transformers = types.ModuleType("transformers")
+    transformers.pipeline = pipeline
+    monkeypatch.setitem(sys.modules, "transformers", transformers)
+    monkeypatch.setattr(module, "_PIPELINES", {})
+    return loaded
+
+
+def test_generate_batches_by_length_in_input_order(pipelines):
+    documents = ["alpha " * 5, "beta", "gamma " * 3, "delta " * 9, "epsilon  " * 2]
+    modeler = TransformersTopicModeler("local-model", batch_size=2)
+
+    topics = modeler.generate(documents)
+
+    assert topics == ["alpha", "beta", "gamma", "delta", "epsilon"]
+    batches = modeler.model.batches
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    lengths = [len(text) for batch in batches for text in batch]
+    assert lengths == sorted(lengths)
+    assert modeler.stats["documents"] == len(documents)
+
+
+def test_pipeline_is_loaded_once(pipelines):
+    first = TransformersTopicModeler("local-model")
+    second = TransformersTopicModeler("local-model")
+
+    first.generate(["cats purr"])
+    second.generate(["stock market"])
+
+    assert pipelines == [("text2text-generation", "local-model", -1)]
+    assert first.model is second.model
@@ -0,0 +1,66 @@
+import os
+import struct
+import threading
+import time
+
+import pytest
+
+from src.Watcher import IN_Q_OVERFLOW
+from src.Watcher import Watcher
+
+
+@pytest.mark.parametrize("inotify", [True, False])
+def test_watcher_reports_completed_files(tmp_path, inotify):
+    reported = []
+    stop = threading.Event()
+    watcher = Watcher(
+        str(tmp_path),
+        reported.extend,
+        debounce=0.1,
+        poll_interval=0.05,
+        inotify=inotify,
+    )
+    thread = threading.Thread(target=watcher.run, args=(stop,))
+    thread.start()
+    try:
+        time.sleep(0.2)
+        # A download in progress is ignored until it gets its final name
+        (tmp_path / "movie.mp4.crdownload").write_text("partial")
+        (tmp_path / "notes.txt").write_text("Test content")
+        time.sleep(0.3)
+        (tmp_path / "movie.mp4.crdownload").rename(tmp_path / "movie.mp4")
+
+        deadline = time.monotonic() + 5
+        while len(reported) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert sorted(reported) == ["movie.mp4", "notes.txt"]
+
+
+def test_watcher_rescans_after_queue_overflow(tmp_path):
+    (tmp_path / "missed.txt").write_text("Test content")
+    (tmp_path / "movie.mp4.part").write_text("partial")
+    reported = []
+    stop = threading.Event()
+
+    def callback(names):
+        reported.extend(names)
+        stop.set()
+
+    watcher = Watcher(str(tmp_path), callback, debounce=0.05)
+    read_fd, write_fd = os.pipe()
+    try:
+        os.write(write_fd, struct.pack("iIII", -1, IN_Q_OVERFLOW, 0, 0))
+        thread = threading.Thread(target=watcher._inotify, args=(read_fd, stop))
+        thread.start()
+        stop.wait(5)
+        stop.set()
+        thread.join()
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+    assert reported == ["missed.txt"]
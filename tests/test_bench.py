@@ -0,0 +1,22 @@
+import pytest
+
+from benchmarks.bench import make_corpus
+from benchmarks.bench import run
+
+
+def test_run(tmp_path):
+    results = run(str(tmp_path), files=200, depth=1, fanout=2, topics=False)
+
+    assert results["scan_flat"]["files"] == 200
+    assert results["scan_deep"]["files"] == 3 * 16
+    assert results["classify_deep"]["files_per_second"] > 0
+    assert set(results) >= {"route_extension", "route", "move"}
+
+
+def test_make_corpus():
+    assert make_corpus(3, words=10) == make_corpus(3, words=10)
+    assert all(len(document.split()) == 10 for document in make_corpus(3, words=10))
+
+
+if __name__ == "__main__":
+    pytest.main()